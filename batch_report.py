@@ -0,0 +1,216 @@
+# batch_report.py
+# Genera reportes de calidad de cemento para un directorio de .LAS sin abrir la app.
+#
+# Uso:
+#   python batch_report.py <directorio_las> <directorio_salida> [--amplitud 72] [--toc 1500]
+#       [--ampliacion 5] [--punzados punzados.csv] [--parametros parametros.csv] [--workers 4]
+#
+# El CSV de --parametros permite valores por pozo, con una fila por archivo y las columnas
+# archivo, amplitud, toc, ampliacion y punzados (las vacías usan los valores por defecto).
+# Los CSV de punzados tienen las columnas TOPE y BASE.
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+
+import pandas as pd
+
+from cemento import METODOS_TOC, ClasificacionIncremental, IndiceCalidad, clasificar_calidad_cemento, estimar_toc_promedio
+from las_io import ENCODING_LAS, LectorLAS, parsear_las
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logo.png')
+
+
+def cargar_punzados(path):
+    """Lee un CSV de punzados con columnas TOPE y BASE (acepta coma decimal y separador ; , o tab)."""
+    punzados = pd.read_csv(path, sep=None, engine='python', dtype=str)
+    punzados.columns = [str(col).strip().upper() for col in punzados.columns]
+    for col in ['TOPE', 'BASE']:
+        punzados[col] = punzados[col].str.replace(',', '.').astype(float)
+    return punzados[['TOPE', 'BASE']]
+
+
+def cargar_parametros(path):
+    """Parámetros por pozo indexados por nombre de archivo."""
+    if path is None:
+        return {}
+    parametros = pd.read_csv(path, dtype={'archivo': str, 'punzados': str})
+    parametros = parametros.set_index('archivo')
+    return {archivo: {k: v for k, v in fila.items() if pd.notna(v)} for archivo, fila in parametros.iterrows()}
+
+
+def nombre_pozo(las_file, archivo):
+    """Nombre del pozo según el encabezado WELL, o el nombre del archivo si no está."""
+    if 'WELL' in las_file.well.keys() and las_file.well.WELL.value:
+        return las_file.well.WELL.value
+    return os.path.splitext(os.path.basename(archivo))[0]
+
+
+def nombre_salida(archivo, well_name):
+    """Nombre del PDF de un pozo: lleva el nombre del archivo .LAS para que dos archivos del
+    mismo pozo (corridas repetidas, copias) no se pisen el reporte."""
+    from report import nombre_reporte
+
+    return f'{os.path.splitext(archivo)[0]} - {nombre_reporte(well_name)}'
+
+
+def resumir_pozo(archivo, bytes_data, amplitud, toc_teorico, encoding=ENCODING_LAS):
+    """Resumen de calidad de cemento de un pozo para comparar pozos de un campo. Nunca lanza.
+
+    Solo se devuelve un diccionario chico y el pozo se recorre por bloques (LectorLAS), así
+    la memoria no crece con el tamaño de los pozos. Los .LAS que no se pueden leer por
+    bloques (envueltos, o con filas que el lector por bloques no entiende) se parsean completos.
+    """
+    resumen = {'archivo': archivo, 'pozo': None, 'estado': 'OK', 'error': None, 'muestras': 0}
+    try:
+        try:
+            lector = LectorLAS(bytes_data, encoding)
+            las_file, columnas = lector.las_file, lector.columnas
+            clasificacion = ClasificacionIncremental(float(amplitud), float(toc_teorico))
+            if 'CBL' in columnas:
+                cbl = columnas.index('CBL')
+                for bloque in lector.bloques():
+                    clasificacion.agregar(bloque[:, 0], bloque[:, cbl])
+        except ValueError:
+            # Se descarta lo acumulado por bloques y se lee con lasio, que es más permisivo
+            las_file, well_data = parsear_las(bytes_data, encoding)
+            columnas = well_data.columns
+            clasificacion = ClasificacionIncremental(float(amplitud), float(toc_teorico))
+            if 'CBL' in columnas:
+                clasificacion.agregar(well_data['DEPTH'].to_numpy(dtype=float), well_data['CBL'].to_numpy(dtype=float))
+        if 'CBL' not in columnas:
+            raise ValueError("La columna 'CBL' no está presente en los datos cargados.")
+        resumen['pozo'] = nombre_pozo(las_file, archivo)
+        resumen['muestras'] = clasificacion.muestras
+        resumen.update(clasificacion.resultado())
+    except Exception as e:
+        resumen['estado'] = 'ERROR'
+        resumen['error'] = f'{type(e).__name__}: {e}'
+    return resumen
+
+
+def procesar_pozo(ruta, params, output_dir, encoding=ENCODING_LAS, dpi=300, formato_imagen='png'):
+    """Clasifica un pozo, estima su TOC y genera el reporte. Nunca lanza: los errores vuelven en el resumen."""
+    from report import generate_report
+
+    resumen = {'archivo': os.path.basename(ruta), 'pozo': None, 'estado': 'OK', 'error': None, 'reporte': None}
+    tiempos = {}
+    inicio = time.perf_counter()
+    try:
+        t = time.perf_counter()
+        with open(ruta, 'rb') as f:
+            las_file, well_data = parsear_las(f.read(), encoding)
+        tiempos['lectura'] = time.perf_counter() - t
+        if 'CBL' not in well_data.columns:
+            raise ValueError("La columna 'CBL' no está presente en los datos cargados.")
+
+        well_name = nombre_pozo(las_file, resumen['archivo'])
+        resumen['pozo'] = well_name
+
+        t = time.perf_counter()
+        amplitud = float(params['amplitud'])
+        toc_teorico = float(params['toc'])
+        ampliacion_rango = float(params['ampliacion'])
+        well_data['calidad_cemento'] = clasificar_calidad_cemento(well_data['CBL'].to_numpy(), amplitud)
+        codigos = well_data['calidad_cemento'].cat.codes.to_numpy()
+        toc_calculado_rango = estimar_toc_promedio(well_data['DEPTH'].to_numpy(), well_data['CBL'].to_numpy(), codigos, toc_teorico)
+
+        tabla_predominantes = pd.DataFrame()
+        if params.get('punzados'):
+            punzados = cargar_punzados(params['punzados'])
+            indice_calidad = IndiceCalidad(well_data['DEPTH'].to_numpy(), codigos)
+            tabla_predominantes = indice_calidad.consultar(punzados['TOPE'], punzados['BASE'], ampliacion_rango)
+            tabla_predominantes = tabla_predominantes[['TOPE', 'BASE', 'Resultado Predominante']]
+        tiempos['clasificacion'] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        report_params = {
+            'Amplitud Cañería Libre Específica': amplitud,
+            'TOC Teórico': toc_teorico,
+            'Ampliación de Rango': ampliacion_rango,
+            'Método de TOC': METODOS_TOC[0]
+        }
+        report_bytes = generate_report(well_data, toc_teorico, toc_calculado_rango,
+                                       tabla_predominantes.get('Resultado Predominante', pd.Series(dtype=object)).tolist(),
+                                       tabla_predominantes, report_params, LOGO_PATH, well_name,
+                                       dpi=dpi, formato_imagen=formato_imagen)
+        resumen['reporte'] = os.path.join(output_dir, nombre_salida(resumen['archivo'], well_name))
+        with open(resumen['reporte'], 'wb') as f:
+            f.write(report_bytes)
+        tiempos['reporte'] = time.perf_counter() - t
+    except Exception as e:
+        resumen['estado'] = 'ERROR'
+        resumen['error'] = f'{type(e).__name__}: {e}'
+    tiempos['total'] = time.perf_counter() - inicio
+    resumen['tiempos'] = tiempos
+    return resumen
+
+
+def imprimir_resumen(resultados, tiempo_total):
+    print(f"\n{'Archivo':<30} {'Estado':<6} {'Lectura':>8} {'Clasif.':>8} {'Reporte':>8} {'Total':>8}")
+    for r in sorted(resultados, key=lambda r: r['archivo']):
+        t = r['tiempos']
+        columnas = ' '.join(f"{t[etapa]:8.2f}" if etapa in t else f"{'-':>8}" for etapa in ['lectura', 'clasificacion', 'reporte', 'total'])
+        print(f"{r['archivo'][:30]:<30} {r['estado']:<6} {columnas}")
+    errores = [r for r in resultados if r['estado'] != 'OK']
+    for r in errores:
+        print(f"  {r['archivo']}: {r['error']}")
+    print(f"\n{len(resultados)} pozos: {len(resultados) - len(errores)} OK, {len(errores)} con error. "
+          f"Tiempo total: {tiempo_total:.1f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera reportes de calidad de cemento para un directorio de archivos .LAS.')
+    parser.add_argument('directorio_las')
+    parser.add_argument('directorio_salida')
+    parser.add_argument('--amplitud', type=float, default=72, help='Amplitud de cañería libre específica')
+    parser.add_argument('--toc', type=float, default=1500, help='TOC teórico')
+    parser.add_argument('--ampliacion', type=float, default=5, help='Ampliación de rango de los punzados')
+    parser.add_argument('--punzados', help='CSV de punzados (TOPE, BASE) usado para todos los pozos')
+    parser.add_argument('--parametros', help='CSV con parámetros por pozo')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Procesos en paralelo')
+    parser.add_argument('--encoding', default=ENCODING_LAS)
+    parser.add_argument('--dpi', type=int, default=300, help='Resolución de las figuras del reporte')
+    parser.add_argument('--formato-imagen', choices=['png', 'jpeg'], default='png', help='Formato de las figuras del reporte')
+    args = parser.parse_args(argv)
+
+    archivos = sorted(f for f in os.listdir(args.directorio_las) if f.lower().endswith('.las'))
+    if not archivos:
+        print(f'No se encontraron archivos .LAS en {args.directorio_las}')
+        return 1
+    # Los reportes se nombran por archivo sin extensión: 'pozo.las' y 'pozo.LAS' se pisarían
+    por_nombre = {}
+    for archivo in archivos:
+        por_nombre.setdefault(os.path.splitext(archivo)[0].lower(), []).append(archivo)
+    repetidos = [', '.join(grupo) for grupo in por_nombre.values() if len(grupo) > 1]
+    if repetidos:
+        print(f"Archivos con el mismo nombre salvo la extensión o mayúsculas: {'; '.join(repetidos)}")
+        return 1
+    os.makedirs(args.directorio_salida, exist_ok=True)
+
+    defaults = {'amplitud': args.amplitud, 'toc': args.toc, 'ampliacion': args.ampliacion, 'punzados': args.punzados}
+    por_pozo = cargar_parametros(args.parametros)
+
+    inicio = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futuros = [executor.submit(procesar_pozo, os.path.join(args.directorio_las, archivo),
+                                   {**defaults, **por_pozo.get(archivo, {})}, args.directorio_salida, args.encoding,
+                                   args.dpi, args.formato_imagen)
+                   for archivo in archivos]
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados.append(resultado)
+            print(f"[{len(resultados)}/{len(archivos)}] {resultado['archivo']}: {resultado['estado']}", flush=True)
+
+    imprimir_resumen(resultados, time.perf_counter() - inicio)
+    return 0 if all(r['estado'] == 'OK' for r in resultados) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
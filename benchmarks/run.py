@@ -0,0 +1,230 @@
+# Benchmarks de punta a punta sobre pozos sintéticos.
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.run [--sizes 10000,100000,1000000,10000000] [--etapas load_data,cemento,...]
+#       [--repeticiones 3] [--ancho-fijo 11] [--output benchmarks/results/<fecha>.json]
+#
+# Cada ejecución escribe un JSON con el entorno y el tiempo de cada etapa por tamaño de
+# pozo, para poder comparar corridas entre commits. El caché en disco de la app se apunta
+# a un directorio temporal, así las corridas no leen pozos guardados por otras.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from io import BytesIO, StringIO
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from benchmarks.synthetic_las import escribir_las_sintetico
+
+TAMANOS = [10000, 100000, 1000000, 10000000]
+AMPLITUD = 72.0
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def medir(funcion, repeticiones):
+    """Mejor tiempo de pared (s) de funcion() en repeticiones corridas."""
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), tiempos
+
+
+def preparar_pozo(n_muestras, ancho=None):
+    """Escribe el LAS sintético en memoria y devuelve sus bytes y la profundidad del TOC."""
+    texto = StringIO()
+    datos = escribir_las_sintetico(texto, n_muestras, ancho=ancho)
+    depth = datos['DEPT'].to_numpy()
+    return texto.getvalue().encode('Windows-1252'), depth[0] + (depth[-1] - depth[0]) / 3
+
+
+def bench_load_data(ctx):
+    import app
+    import cache_disco
+    import well_store
+
+    def correr():
+        # Se vacían el almacén y el caché en disco para medir el parseo (más el guardado en
+        # disco, como la primera vez que se abre un pozo) y no un acierto de caché
+        well_store.store.limpiar()
+        cache_disco.cache.limpiar()
+        ctx['las_file'], ctx['well_data'] = app.load_data(BytesIO(ctx['bytes']))
+    return correr
+
+
+def bench_load_data_cache_disco(ctx):
+    import app
+    import cache_disco
+    import well_store
+
+    # El pozo tiene que estar en el caché en disco y no en memoria, como al reiniciar el servidor
+    well_store.store.limpiar()
+    cache_disco.cache.limpiar()
+    app.load_data(BytesIO(ctx['bytes']))
+
+    def correr():
+        well_store.store.limpiar()
+        app.load_data(BytesIO(ctx['bytes']))
+    return correr
+
+
+def bench_parseo_lasio(ctx):
+    from las_io import parsear_las
+    return lambda: parsear_las(ctx['bytes'], motor='lasio')
+
+
+def bench_parseo_rapido(ctx):
+    from las_io import parsear_las
+    return lambda: parsear_las(ctx['bytes'], motor='rapido')
+
+
+def bench_cemento(ctx):
+    from cemento import IndiceCalidad, clasificar_calidad_cemento, estimar_toc_promedio
+
+    well_data = ctx['well_data']
+    depth = well_data['DEPTH'].to_numpy()
+    topes = np.linspace(depth.min(), depth.max(), 200)
+
+    def correr():
+        calidad = clasificar_calidad_cemento(well_data['CBL'].to_numpy(), AMPLITUD)
+        codigos = np.asarray(calidad.codes)
+        estimar_toc_promedio(depth, well_data['CBL'].to_numpy(), codigos, ctx['toc_teorico'])
+        IndiceCalidad(depth, codigos).consultar(topes, topes + 3, 5)
+    return correr
+
+
+def bench_corte(ctx):
+    import corte
+
+    def correr():
+        well_data = ctx['well_data'][['DEPTH', 'CBL', 'CCL']].copy()
+        gain = 0.15
+        umbral = gain * (well_data['CCL'].max() - well_data['CCL'].mean())
+        cuplas_table = corte.identify_cuplas(well_data, umbral)
+        fig, ax = plt.subplots()
+        corte.posibles_cortes(well_data, cuplas_table, ax)
+        plt.close(fig)
+    return correr
+
+
+def bench_las_q(ctx):
+    from estadisticas import EstadisticasCurvas, correlacion_curvas, pares_mas_correlacionados
+    from las_q import grilla_histogramas
+
+    def correr():
+        well_data = ctx['well_data']
+        estadisticas = EstadisticasCurvas(well_data)
+        grilla_histogramas(estadisticas, estadisticas.columnas[:12])
+        pares_mas_correlacionados(correlacion_curvas(well_data), 10)
+    return correr
+
+
+def bench_generate_report(ctx):
+    from cemento import IndiceCalidad, clasificar_calidad_cemento, estimar_toc_promedio
+    from report import generate_report
+
+    well_data = ctx['well_data'].copy()
+    well_data['calidad_cemento'] = clasificar_calidad_cemento(well_data['CBL'].to_numpy(), AMPLITUD)
+    depth = well_data['DEPTH'].to_numpy()
+    codigos = well_data['calidad_cemento'].cat.codes.to_numpy()
+    toc_calculado = estimar_toc_promedio(depth, well_data['CBL'].to_numpy(), codigos, ctx['toc_teorico'])
+    topes = np.linspace(ctx['toc_teorico'], depth.max() - 10, 5)
+    tabla = IndiceCalidad(depth, codigos).consultar(topes, topes + 3, 5)[['TOPE', 'BASE', 'Resultado Predominante']]
+    params = {'Amplitud Cañería Libre Específica': AMPLITUD, 'TOC Teórico': ctx['toc_teorico'], 'Ampliación de Rango': 5}
+    logo = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logo.png')
+
+    def correr():
+        generate_report(well_data, ctx['toc_teorico'], toc_calculado, tabla['Resultado Predominante'].tolist(),
+                        tabla, params, logo, 'SINTETICO-1')
+    return correr
+
+
+# El orden importa: load_data deja el pozo cargado para las etapas siguientes
+ETAPAS = {
+    'load_data': bench_load_data,
+    'load_data_cache_disco': bench_load_data_cache_disco,
+    'parseo_lasio': bench_parseo_lasio,
+    'parseo_rapido': bench_parseo_rapido,
+    'cemento': bench_cemento,
+    'corte': bench_corte,
+    'las_q': bench_las_q,
+    'generate_report': bench_generate_report,
+}
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks de punta a punta sobre pozos sintéticos.')
+    parser.add_argument('--sizes', default=','.join(str(n) for n in TAMANOS), help='Cantidad de muestras por pozo, separadas por coma')
+    parser.add_argument('--etapas', default=','.join(ETAPAS), help='Etapas a medir, separadas por coma')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--ancho-fijo', type=int, help='Escribir los datos en columnas de ese ancho (por defecto separados por un espacio)')
+    parser.add_argument('--output', help='Archivo JSON de resultados (por defecto benchmarks/results/<fecha>.json)')
+    args = parser.parse_args(argv)
+
+    tamanos = [int(n) for n in args.sizes.split(',')]
+    etapas = [e.strip() for e in args.etapas.split(',')]
+    desconocidas = set(etapas) - set(ETAPAS)
+    if desconocidas:
+        parser.error(f'Etapas desconocidas: {", ".join(sorted(desconocidas))}')
+    # load_data siempre corre porque las demás etapas usan el pozo que deja cargado
+    etapas = ['load_data'] + [e for e in ETAPAS if e in etapas and e != 'load_data']
+
+    import cache_disco
+    directorio_cache = tempfile.TemporaryDirectory(prefix='bench_cache_pozos_')
+    cache_disco.cache = cache_disco.CacheDisco(directorio_cache.name, cache_disco.TAMANO_MAXIMO_MB * 1024 * 1024)
+
+    resultados = []
+    for n_muestras in tamanos:
+        ctx = {}
+        inicio = time.perf_counter()
+        ctx['bytes'], ctx['toc_teorico'] = preparar_pozo(n_muestras, args.ancho_fijo)
+        print(f'\n{n_muestras} muestras ({len(ctx["bytes"]) / 1e6:.1f} MB, generado en {time.perf_counter() - inicio:.1f} s)', flush=True)
+        for etapa in etapas:
+            # En pozos grandes una sola corrida alcanza
+            repeticiones = args.repeticiones if n_muestras <= 100000 else 1
+            try:
+                mejor, tiempos = medir(ETAPAS[etapa](ctx), repeticiones)
+                resultados.append({'etapa': etapa, 'muestras': n_muestras, 'segundos': mejor, 'corridas': tiempos})
+                print(f'  {etapa:<21} {mejor:10.3f} s', flush=True)
+            except Exception as e:
+                resultados.append({'etapa': etapa, 'muestras': n_muestras, 'error': f'{type(e).__name__}: {e}'})
+                print(f'  {etapa:<21} ERROR {type(e).__name__}: {e}', flush=True)
+    directorio_cache.cleanup()
+
+    salida = args.output or os.path.join(DIRECTORIO_RESULTADOS, f'{datetime.now().strftime("%Y%m%d-%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w') as f:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit_actual(),
+            'python': sys.version.split()[0],
+            'plataforma': platform.platform(),
+            'resultados': resultados,
+        }, f, indent=2)
+    print(f'\nResultados escritos en {salida}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# Generador de archivos .LAS sintéticos para los benchmarks.
+#
+# Produce pozos con CBL de cañería libre sobre el tope de cemento y cemento adherido
+# por debajo, CCL con picos de cupla cada ~9.6 m y curvas adicionales con nulos.
+
+import numpy as np
+import pandas as pd
+
+NULL_VALUE = -999.25
+
+
+def generar_curvas(n_muestras, top=500.0, paso=0.1, n_curvas_extra=4, densidad_nulos=0.01,
+                   toc=None, espaciado_cuplas=9.6, amplitud_libre=72.0, seed=0):
+    """Devuelve un DataFrame con DEPT, CBL, CCL y n_curvas_extra curvas sintéticas."""
+    rng = np.random.default_rng(seed)
+    depth = top + np.arange(n_muestras) * paso
+    if toc is None:
+        # Tope de cemento a un tercio del intervalo
+        toc = top + (depth[-1] - top) / 3
+
+    # CBL: cañería libre sobre el TOC, buena adherencia debajo y una zona regular en la transición
+    cbl = np.where(depth < toc, amplitud_libre, 0.08 * amplitud_libre)
+    transicion = (depth >= toc) & (depth < toc + 30)
+    cbl[transicion] = 0.3 * amplitud_libre
+    cbl = cbl + rng.normal(0, 0.04 * amplitud_libre, n_muestras)
+
+    # CCL: ruido más un pico por cupla cada ~espaciado_cuplas con algo de variación
+    ccl = rng.normal(0, 1, n_muestras)
+    n_cuplas = int((depth[-1] - top) / espaciado_cuplas) + 1
+    cuplas = top + np.cumsum(rng.normal(espaciado_cuplas, 0.1, n_cuplas))
+    indices = np.searchsorted(depth, cuplas[cuplas <= depth[-1]])
+    for desplazamiento, amplitud in [(0, 12.0), (1, 6.0)]:
+        validos = indices + desplazamiento < n_muestras
+        ccl[indices[validos] + desplazamiento] += amplitud
+        # En las cuplas el CBL también sube
+        cbl[indices[validos] + desplazamiento] += 0.3 * amplitud_libre
+
+    curvas = {'DEPT': depth, 'CBL': np.clip(cbl, 0, None), 'CCL': ccl}
+    for i in range(n_curvas_extra):
+        curvas[f'CURVA{i + 1:02d}'] = 50 + 20 * np.sin(depth / (15 + 5 * i)) + rng.normal(0, 2, n_muestras)
+
+    datos = pd.DataFrame(curvas)
+    if densidad_nulos > 0:
+        for col in datos.columns[1:]:
+            nulos = rng.random(n_muestras) < densidad_nulos
+            datos.loc[nulos, col] = np.nan
+    return datos
+
+
+def escribir_las(datos, destino, well_name='SINTETICO-1', null_value=NULL_VALUE, chunk=500000, ancho=None):
+    """Escribe un LAS 2.0 sin envolver en destino (ruta o archivo de texto abierto).
+
+    Con ancho los valores van en columnas de ese ancho alineadas a la derecha, como los
+    escriben lasio y los equipos de perfilaje; si no, separados por un espacio.
+    """
+    depth = datos['DEPT'].to_numpy()
+    paso = float(depth[1] - depth[0]) if len(depth) > 1 else 0.0
+    unidades = {'DEPT': 'M', 'CBL': 'MV', 'CCL': 'MV'}
+
+    encabezado = [
+        '~Version Information',
+        ' VERS.                 2.0 : CWLS LOG ASCII STANDARD - VERSION 2.0',
+        ' WRAP.                  NO : ONE LINE PER DEPTH STEP',
+        '~Well Information',
+        f' STRT.M          {depth[0]:.4f} : START DEPTH',
+        f' STOP.M          {depth[-1]:.4f} : STOP DEPTH',
+        f' STEP.M          {paso:.4f} : STEP',
+        f' NULL.          {null_value} : NULL VALUE',
+        f' WELL.     {well_name} : WELL',
+        ' COMP.     SINTETICO : COMPANY',
+        '~Curve Information',
+    ]
+    encabezado += [f' {col}.{unidades.get(col, "")} : {col}' for col in datos.columns]
+    encabezado.append('~ASCII')
+
+    def escribir(f):
+        f.write('\n'.join(encabezado) + '\n')
+        for inicio in range(0, len(datos), chunk):
+            bloque = datos.iloc[inicio:inicio + chunk].fillna(null_value)
+            if ancho:
+                np.savetxt(f, bloque.to_numpy(), fmt=f'%{ancho}.4f', delimiter=' ', newline='\n')
+            else:
+                bloque.to_csv(f, sep=' ', header=False, index=False, float_format='%.4f', lineterminator='\n')
+
+    if hasattr(destino, 'write'):
+        escribir(destino)
+    else:
+        with open(destino, 'w', encoding='Windows-1252', newline='') as f:
+            escribir(f)
+
+
+def escribir_las_sintetico(destino, n_muestras, **kwargs):
+    """Genera y escribe un pozo sintético de n_muestras; kwargs se pasan a generar_curvas."""
+    well_name = kwargs.pop('well_name', 'SINTETICO-1')
+    ancho = kwargs.pop('ancho', None)
+    datos = generar_curvas(n_muestras, **kwargs)
+    escribir_las(datos, destino, well_name=well_name, ancho=ancho)
+    return datos
@@ -0,0 +1,165 @@
+# Caché en disco de pozos parseados, en formato Arrow IPC.
+#
+# Cada pozo se guarda en <directorio>/<clave>.arrow: las curvas como columnas y, en los
+# metadatos del esquema, el encabezado del .LAS y los atributos del DataFrame. Los archivos
+# no se comprimen, así que al reabrir un pozo se mapean en memoria y las columnas numéricas
+# se usan sin copiarlas: un pozo ya visto no se vuelve a parsear aunque el servidor se haya
+# reiniciado. La clave es la misma del almacén en memoria (hash del contenido más las
+# opciones de carga) y cuando el directorio supera el tamaño máximo se borran los archivos
+# usados hace más tiempo.
+
+import json
+import os
+import re
+import tempfile
+import threading
+from io import StringIO
+
+import lasio
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from well_store import ATTR_CLAVE
+
+# Directorio y tamaño máximo por defecto (MB); se cambian con LAS_CACHE_DIR y LAS_CACHE_DISCO_MB
+# (0 desactiva el caché)
+DIRECTORIO_POR_DEFECTO = '.cache_pozos'
+TAMANO_MAXIMO_MB = 4096
+
+EXTENSION = '.arrow'
+
+# Columna donde se guarda el índice del DataFrame cuando no es un RangeIndex (la profundidad)
+COLUMNA_INDICE = '__indice__'
+
+
+class CacheDisco:
+    """Pozos parseados en archivos Arrow IPC, con desalojo de los menos usados por tamaño total."""
+
+    def __init__(self, directorio, max_bytes):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self):
+        return self.max_bytes > 0
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, re.sub(r'[^\w.-]', '_', clave) + EXTENSION)
+
+    def cargar(self, clave):
+        """(las_file, well_data) guardados con la clave, o None si no están o no se pueden leer."""
+        if not self.activo:
+            return None
+        ruta = self.ruta(clave)
+        try:
+            tabla = ipc.open_file(pa.memory_map(ruta)).read_all()
+            metadatos = tabla.schema.metadata
+            info = json.loads(metadatos[b'las_info'])
+            las_file = lasio.read(StringIO(metadatos[b'las_encabezado'].decode('utf-8')), ignore_data=True)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Archivo incompleto o de una versión anterior: se descarta y se vuelve a parsear
+            self._borrar(ruta)
+            return None
+
+        # split_blocks evita juntar las columnas en un bloque: cada una queda sobre el mapa en memoria
+        well_data = tabla.to_pandas(split_blocks=True)
+        if info['indice']:
+            well_data = well_data.set_index(COLUMNA_INDICE)
+            well_data.index.name = info['nombre_indice']
+        well_data.attrs.update(info['attrs'])
+        try:
+            # La fecha de modificación ordena los archivos para el desalojo
+            os.utime(ruta)
+        except OSError:
+            pass
+        return las_file, well_data
+
+    def guardar(self, clave, encabezado, well_data):
+        """Guarda el pozo; encabezado es el texto del .LAS hasta ~A (las_io.texto_encabezado)."""
+        if not self.activo or encabezado is None:
+            return
+        arrays, nombres = [], []
+        indice = not isinstance(well_data.index, pd.RangeIndex)
+        if indice:
+            arrays.append(pa.array(well_data.index.to_numpy()))
+            nombres.append(COLUMNA_INDICE)
+        for i, columna in enumerate(well_data.columns):
+            serie = well_data.iloc[:, i]
+            # En las curvas el NaN se guarda como valor y no como nulo de Arrow, así se leen sin copiarlas
+            arrays.append(pa.array(serie.to_numpy()) if serie.dtype.kind == 'f' else pa.array(serie, from_pandas=True))
+            nombres.append(str(columna))
+        info = {
+            'indice': indice,
+            'nombre_indice': well_data.index.name,
+            'attrs': {k: v for k, v in well_data.attrs.items() if k != ATTR_CLAVE},
+        }
+        tabla = pa.Table.from_arrays(arrays, names=nombres).replace_schema_metadata({
+            'las_encabezado': encabezado.encode('utf-8'),
+            'las_info': json.dumps(info, default=str),
+        })
+
+        ruta = self.ruta(clave)
+        temporal = None
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            # Se escribe en un temporal y se renombra: otro proceso nunca ve un archivo a medias
+            fd, temporal = tempfile.mkstemp(suffix='.tmp', dir=self.directorio)
+            with os.fdopen(fd, 'wb') as f, ipc.new_file(f, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+            os.replace(temporal, ruta)
+        except OSError:
+            self._borrar(temporal)
+            return
+        self._desalojar(conservar=ruta)
+
+    def archivos(self):
+        """(ruta, bytes, fecha de uso) de cada pozo guardado, del usado hace más tiempo al más reciente."""
+        try:
+            entradas = [e for e in os.scandir(self.directorio) if e.name.endswith(EXTENSION)]
+        except FileNotFoundError:
+            return []
+        archivos = []
+        for entrada in entradas:
+            try:
+                estado = entrada.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((entrada.path, estado.st_size, estado.st_mtime))
+        return sorted(archivos, key=lambda archivo: archivo[2])
+
+    @property
+    def bytes_usados(self):
+        return sum(nbytes for _, nbytes, _ in self.archivos())
+
+    def limpiar(self):
+        for ruta, _, _ in self.archivos():
+            self._borrar(ruta)
+
+    def _borrar(self, ruta):
+        if ruta is None:
+            return
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+    def _desalojar(self, conservar=None):
+        # Siempre se conserva el último pozo guardado, aunque exceda el tamaño máximo por sí solo
+        with self._lock:
+            archivos = self.archivos()
+            total = sum(nbytes for _, nbytes, _ in archivos)
+            for ruta, nbytes, _ in archivos:
+                if total <= self.max_bytes:
+                    break
+                if ruta == conservar:
+                    continue
+                self._borrar(ruta)
+                total -= nbytes
+
+
+cache = CacheDisco(os.environ.get('LAS_CACHE_DIR') or DIRECTORIO_POR_DEFECTO,
+                   int(float(os.environ.get('LAS_CACHE_DISCO_MB', TAMANO_MAXIMO_MB)) * 1024 * 1024))
@@ -0,0 +1,113 @@
+# campo.py
+# Comparación de calidad de cemento entre los pozos de un campo o locación
+
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import streamlit as st
+
+from batch_report import resumir_pozo
+from cemento import CALIDADES
+from instrumentation import medir
+from las_io import ENCODING_LAS, clave_contenido
+
+# Procesos que parsean pozos a la vez; limita la memoria pico a unos pocos pozos
+# completos aunque se suban 40. Se puede cambiar con LAS_CAMPO_WORKERS.
+MAX_WORKERS = int(os.environ.get('LAS_CAMPO_WORKERS', min(os.cpu_count() or 1, 4)))
+
+# Un solo pool para todo el servidor, con procesos lanzados por spawn: hacer fork de un
+# proceso con varios hilos (el servidor de Streamlit) puede dejar al hijo trabado en un
+# lock tomado por otro hilo. Los procesos se crean una vez y se reutilizan entre reruns.
+_executor = None
+_lock_executor = threading.Lock()
+
+# Resúmenes ya calculados por (contenido, codificación, amplitud, TOC teórico); son
+# diccionarios chicos, compartidos entre sesiones.
+MAX_RESUMENES = 1000
+_resumenes = OrderedDict()
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _lock_executor:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def _descartar_pool(executor):
+    """Descarta un pool roto (p. ej. un proceso murió por falta de memoria) para que el próximo rerun cree otro."""
+    global _executor
+    with _lock_executor:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def resumir_archivos(archivos, amplitud, toc_teorico, encoding=ENCODING_LAS, progreso=None):
+    """Resumen de cada archivo subido, en el mismo orden; los pozos nuevos se procesan en paralelo."""
+    claves = [(clave_contenido(archivo.getvalue(), encoding), amplitud, toc_teorico) for archivo in archivos]
+    resultados = {}
+    with _lock:
+        for clave in claves:
+            if clave in _resumenes:
+                _resumenes.move_to_end(clave)
+                resultados[clave] = _resumenes[clave]
+
+    pendientes = {clave: archivo for clave, archivo in zip(claves, archivos) if clave not in resultados}
+    if pendientes:
+        executor = _pool()
+        try:
+            futuros = {executor.submit(resumir_pozo, archivo.name, archivo.getvalue(), amplitud, toc_teorico, encoding): clave
+                       for clave, archivo in pendientes.items()}
+            for terminados, futuro in enumerate(as_completed(futuros), start=1):
+                resultados[futuros[futuro]] = futuro.result()
+                if progreso is not None:
+                    progreso(terminados / len(futuros))
+        except BrokenProcessPool:
+            _descartar_pool(executor)
+            raise
+        with _lock:
+            for clave in pendientes:
+                _resumenes[clave] = resultados[clave]
+            while len(_resumenes) > MAX_RESUMENES:
+                _resumenes.popitem(last=False)
+
+    # Se copia para que el nombre del archivo sea el de esta subida aunque el resumen venga del caché
+    return [{**resultados[clave], 'archivo': archivo.name} for clave, archivo in zip(claves, archivos)]
+
+
+def campo(archivos):
+    st.title('Comparación de Calidad de Cemento del Campo')
+
+    amplitud_caneria_libre_especifica = float(st.sidebar.text_input('Amplitud de Cañería Libre Específica', '72'))
+    toc_teorico = float(st.sidebar.text_input('TOC Teórico', '1500'))
+
+    barra = st.progress(0.0, text=f'Procesando {len(archivos)} pozos...')
+    with medir('campo.resumen', pozos=len(archivos)):
+        resumenes = resumir_archivos(archivos, amplitud_caneria_libre_especifica, toc_teorico,
+                                     progreso=lambda fraccion: barra.progress(fraccion, text=f'Procesando {len(archivos)} pozos...'))
+    barra.empty()
+
+    tabla = pd.DataFrame(resumenes)
+    correctos = tabla[tabla['estado'] == 'OK']
+    errores = tabla[tabla['estado'] != 'OK']
+    if not errores.empty:
+        st.error(f'{len(errores)} archivos no se pudieron analizar.')
+        st.table(errores[['archivo', 'error']])
+    if correctos.empty:
+        return
+
+    columnas_porcentaje = [f'% {calidad}' for calidad in CALIDADES if calidad != 'SD']
+    tabla_campo = correctos[['pozo', 'archivo', 'muestras', 'TOC Calculado', *columnas_porcentaje, 'Resultado Predominante']]
+    st.write(f'Calidad de cemento por debajo del TOC teórico ({toc_teorico:.2f} m), amplitud de cañería libre {amplitud_caneria_libre_especifica}:')
+    st.dataframe(tabla_campo.style.format({'TOC Calculado': '{:.2f}', **{col: '{:.1f}' for col in columnas_porcentaje}}),
+                 hide_index=True)
+
+    st.bar_chart(tabla_campo.set_index('archivo')[columnas_porcentaje])
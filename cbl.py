@@ -3,12 +3,16 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from io import StringIO
-from scipy.signal import savgol_filter
 import numpy as np
-import os
-from app import generate_report  # Importar la función desde app.py
+from cemento import (CALIDADES, METODOS_TOC, VENTANA_TOC, IndiceCalidad, codigos_calidad_cemento, estimar_toc_promedio,
+                     estimar_toc_transicion, porcentajes_calidad, suavizar_cbl)
+from report import generate_report, guardar_figura, nombre_reporte
+import well_store
+from welllog import well_log
+from instrumentation import medir
 
 def verificar_calidad_cemento(row, amplitud_caneria_libre_especifica):
+    """Versión por fila de las reglas de calidad; cbl() usa cemento.codigos_calidad_cemento."""
     limite_amplitud_cbl_bueno = 0.1 * amplitud_caneria_libre_especifica
     if row['CBL'] < limite_amplitud_cbl_bueno:
         return "Bueno"
@@ -36,6 +40,60 @@ def convert_column_to_float(df, column_name):
     """Convierte una columna de un DataFrame a float, manejando cadenas con comas como separadores decimales."""
     df[column_name] = df[column_name].apply(safe_replace_comma).astype(float)
 
+def grafico_calidad_cemento(well_data, rango_analizado, calidad_cemento_rango, table_data, toc_teorico, toc_calculado_rango,
+                            banda=None):
+    """Gráfico de calidad de cemento vs. CBL y profundidad, renderizado a PNG."""
+    fig, ax = plt.subplots(figsize=(6, 10))
+    scatter = sns.scatterplot(data=well_data, x='CBL', y='DEPTH', hue='calidad_cemento', palette='viridis', s=30, ax=ax)
+    ax.invert_yaxis()
+    plt.axhline(y=toc_calculado_rango, color='blue', linestyle='--', label='TOC Calculado en el Rango')
+    if banda is not None:
+        ax.axhspan(banda[0], banda[1], alpha=0.2, color='blue', label='Banda de Confianza del TOC')
+    plt.axhline(y=rango_analizado['DEPTH'].min(), color='green', linestyle='--', label='Inicio del Rango Analizado')
+    plt.axhline(y=rango_analizado['DEPTH'].max(), color='orange', linestyle='--', label='Fin del Rango Analizado')
+
+    # Verificar si calidad_cemento_rango está vacío
+    if not calidad_cemento_rango.empty:
+        resultado_predominante = calidad_cemento_rango.idxmax()
+        porcentaje_predominante = calidad_cemento_rango.max()
+    else:
+        resultado_predominante = "No disponible"
+        porcentaje_predominante = 0.0
+
+    plt.annotate(f'{resultado_predominante} - {porcentaje_predominante:.2f}%', 
+                 xy=(0.02, 0.98), xycoords='axes fraction',
+                 ha='left', va='top',
+                 fontsize=12, color='red', weight='bold')
+
+    plt.annotate(f'TOC Teórico: {toc_teorico} m', 
+                 xy=(0.02, 0.93), xycoords='axes fraction',
+                 ha='left', va='top',
+                 fontsize=10, color='blue')
+
+    plt.annotate(f'Rango Analizado: {toc_teorico:.2f} m a {well_data["DEPTH"].max():.2f} m', 
+                 xy=(1.02, 0.5), xycoords='axes fraction',
+                 ha='left', va='center',
+                 fontsize=10, color='black', rotation='vertical')
+
+    plt.annotate(f'TOC Calculado en el Rango: {toc_calculado_rango:.2f} m', 
+                 xy=(0.02, 0.83), xycoords='axes fraction',
+                 ha='left', va='top',
+                 fontsize=10, color='blue')
+
+    table = plt.table(cellText=table_data, colLabels=None, cellLoc='left', loc='bottom', bbox=[0.2, -0.3, 0.8, 0.2])
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+
+    plt.xlabel('Amplitud de CBL')
+    plt.ylabel('Profundidad (DEPTH)')
+    plt.title('Relación entre Calidad del Cemento, CBL y Profundidad')
+    plt.legend(title='Calidad del Cemento', bbox_to_anchor=(1.05, 1), loc='upper left')
+
+    # Misma resolución que usa st.pyplot
+    imagen = guardar_figura(fig, 200, 'png').getvalue()
+    plt.close(fig)
+    return imagen
+
 def cbl(las_file, well_data, well_name):
     st.title('Análisis de Calidad de Cemento')
 
@@ -43,79 +101,68 @@ def cbl(las_file, well_data, well_name):
         amplitud_caneria_libre_especifica = st.sidebar.text_input('Amplitud de Cañería Libre Específica', '72')
         toc_teorico = st.sidebar.text_input('TOC Teórico', '1500')
         ampliacion_rango = st.sidebar.selectbox('Ampliación de Rango', options=[5, 10, 15, 20])
+        metodo_toc = st.sidebar.selectbox('Método de TOC', options=METODOS_TOC)
         amplitud_caneria_libre_especifica = float(amplitud_caneria_libre_especifica)
         toc_teorico = float(toc_teorico)
 
-        well_data['calidad_cemento'] = well_data.apply(verificar_calidad_cemento, args=(amplitud_caneria_libre_especifica,), axis=1)
-        rango_analizado = well_data[(well_data['DEPTH'] >= toc_teorico) & (well_data['DEPTH'] <= well_data['DEPTH'].max())]
-
-        toc_candidates_rango = rango_analizado[rango_analizado['calidad_cemento'] == 'Malo']
-        toc_candidates_rango = toc_candidates_rango[toc_candidates_rango['CBL'] > 10].nlargest(10, 'DEPTH')['DEPTH']
-        toc_calculado_rango = toc_candidates_rango.mean()
+        # Cada etapa se cachea por pozo con solo los parámetros que la afectan, así un cambio
+        # de TOC o de ampliación no vuelve a clasificar ni a suavizar el pozo completo.
+        clave = well_store.clave_pozo(well_data)
+        log = well_log(well_data)
+        depth = well_data['DEPTH'].to_numpy()
+        cbl_values = well_data['CBL'].to_numpy()
+
+        with medir('cbl.clasificacion'):
+            codigos = well_store.store.derivado(clave, 'cbl.clasificacion', (amplitud_caneria_libre_especifica,),
+                                                lambda: codigos_calidad_cemento(cbl_values, amplitud_caneria_libre_especifica))
+            well_data['calidad_cemento'] = pd.Categorical.from_codes(codigos, categories=CALIDADES)
+        rango_analizado = well_data.iloc[log.ventana(toc_teorico, None)]
+
+        banda_toc = None
+        with medir('cbl.toc', metodo=metodo_toc):
+            if metodo_toc == METODOS_TOC[1]:
+                # No depende del TOC teórico: mira el perfil completo
+                transicion = well_store.store.derivado(
+                    clave, 'cbl.toc_transicion', (amplitud_caneria_libre_especifica, VENTANA_TOC),
+                    lambda: estimar_toc_transicion(depth, cbl_values, amplitud_caneria_libre_especifica))
+                if np.isnan(transicion['toc']):
+                    st.warning("No se encontró una transición de cañería libre a cementada; se usa el promedio de muestras Malo.")
+                    metodo_toc = METODOS_TOC[0]
+                else:
+                    toc_calculado_rango = transicion['toc']
+                    banda_toc = (transicion['tope'], transicion['base'])
+                    st.caption(f"Banda de confianza del TOC: {banda_toc[0]:.2f} m - {banda_toc[1]:.2f} m "
+                               f"(CBL libre {transicion['nivel_libre']:.1f}, cementado {transicion['nivel_cementado']:.1f})")
+            if metodo_toc == METODOS_TOC[0]:
+                toc_calculado_rango = well_store.store.derivado(
+                    clave, 'cbl.toc', (amplitud_caneria_libre_especifica, toc_teorico),
+                    lambda: estimar_toc_promedio(depth, cbl_values, codigos, toc_teorico))
 
         if toc_teorico > toc_calculado_rango:
             st.warning("El TOC teórico es mayor que el TOC calculado en el rango. Verifique los valores ingresados.")
 
-        fig, ax = plt.subplots(figsize=(6, 10))
-        scatter = sns.scatterplot(data=well_data, x='CBL', y='DEPTH', hue='calidad_cemento', palette='viridis', s=30, ax=ax)
-        ax.invert_yaxis()
-        plt.axhline(y=toc_calculado_rango, color='blue', linestyle='--', label='TOC Calculado en el Rango')
-        plt.axhline(y=rango_analizado['DEPTH'].min(), color='green', linestyle='--', label='Inicio del Rango Analizado')
-        plt.axhline(y=rango_analizado['DEPTH'].max(), color='orange', linestyle='--', label='Fin del Rango Analizado')
-
-        calidad_cemento_rango = rango_analizado['calidad_cemento'].value_counts(normalize=True) * 100
-
-        # Verificar si calidad_cemento_rango está vacío
-        if not calidad_cemento_rango.empty:
-            resultado_predominante = calidad_cemento_rango.idxmax()
-            porcentaje_predominante = calidad_cemento_rango.max()
-        else:
-            resultado_predominante = "No disponible"
-            porcentaje_predominante = 0.0
-
-        plt.annotate(f'{resultado_predominante} - {porcentaje_predominante:.2f}%', 
-                     xy=(0.02, 0.98), xycoords='axes fraction',
-                     ha='left', va='top',
-                     fontsize=12, color='red', weight='bold')
-
-        plt.annotate(f'TOC Teórico: {toc_teorico} m', 
-                     xy=(0.02, 0.93), xycoords='axes fraction',
-                     ha='left', va='top',
-                     fontsize=10, color='blue')
-
-        plt.annotate(f'Rango Analizado: {toc_teorico:.2f} m a {well_data["DEPTH"].max():.2f} m', 
-                     xy=(1.02, 0.5), xycoords='axes fraction',
-                     ha='left', va='center',
-                     fontsize=10, color='black', rotation='vertical')
-
-        plt.annotate(f'TOC Calculado en el Rango: {toc_calculado_rango:.2f} m', 
-                     xy=(0.02, 0.83), xycoords='axes fraction',
-                     ha='left', va='top',
-                     fontsize=10, color='blue')
-
-        malo_percentage = calidad_cemento_rango.get('Malo', 0.0)
-        bueno_percentage = calidad_cemento_rango.get('Bueno', 0.0)
-        regular_percentage = calidad_cemento_rango.get('Regular', 0.0)
-
-        with st.expander("Datos del Rango Analizado"):
-            table_data = [['Rango Analizado', f'{toc_teorico:.2f} m - {well_data["DEPTH"].max():.2f} m'],
-                          ['Calidad Bueno', f'{bueno_percentage:.2f}%'],
-                          ['Calidad Malo', f'{malo_percentage:.2f}%'],
-                          ['Calidad Regular', f'{regular_percentage:.2f}%']]
-
-        table = plt.table(cellText=table_data, colLabels=None, cellLoc='left', loc='bottom', bbox=[0.2, -0.3, 0.8, 0.2])
-        table.auto_set_font_size(False)
-        table.set_fontsize(10)
-
-        with st.expander("Tabla del Rango Analizado"):
-            st.table(rango_analizado)
-
-        plt.xlabel('Amplitud de CBL')
-        plt.ylabel('Profundidad (DEPTH)')
-        plt.title('Relación entre Calidad del Cemento, CBL y Profundidad')
-        plt.legend(title='Calidad del Cemento', bbox_to_anchor=(1.05, 1), loc='upper left')
-
-        st.pyplot(fig)
+        with medir('cbl.grafico_calidad'):
+            calidad_cemento_rango = porcentajes_calidad(rango_analizado['calidad_cemento'])
+
+            malo_percentage = calidad_cemento_rango.get('Malo', 0.0)
+            bueno_percentage = calidad_cemento_rango.get('Bueno', 0.0)
+            regular_percentage = calidad_cemento_rango.get('Regular', 0.0)
+
+            with st.expander("Datos del Rango Analizado"):
+                table_data = [['Rango Analizado', f'{toc_teorico:.2f} m - {well_data["DEPTH"].max():.2f} m'],
+                              ['Calidad Bueno', f'{bueno_percentage:.2f}%'],
+                              ['Calidad Malo', f'{malo_percentage:.2f}%'],
+                              ['Calidad Regular', f'{regular_percentage:.2f}%']]
+
+            with st.expander("Tabla del Rango Analizado"):
+                st.table(rango_analizado)
+
+            # El gráfico solo depende de la amplitud, del TOC teórico y del método: se cachea ya renderizado
+            imagen = well_store.store.derivado(
+                clave, 'cbl.grafico_calidad', (amplitud_caneria_libre_especifica, toc_teorico, metodo_toc),
+                lambda: grafico_calidad_cemento(well_data, rango_analizado, calidad_cemento_rango, table_data,
+                                                toc_teorico, toc_calculado_rango, banda_toc))
+            st.image(imagen)
         
         tabla_copiada = st.text_area("Pegar tabla de Excel (2 columnas):", "")
         resultados_predominantes = []
@@ -135,23 +182,12 @@ def cbl(las_file, well_data, well_name):
                 min_depth = pzdo_df['TOPE'].min() - ampliacion_rango
                 max_depth = pzdo_df['BASE'].max() + ampliacion_rango
                 
-                for index, row in pzdo_df.iterrows():
-                    tope_rango = row['TOPE'] - ampliacion_rango
-                    base_rango = row['BASE'] + ampliacion_rango
-
-                    rango_analizado = well_data[(well_data['DEPTH'] >= tope_rango) & (well_data['DEPTH'] <= base_rango)]
-
-                    well_data['calidad_cemento'] = well_data.apply(
-                        verificar_calidad_cemento, args=(amplitud_caneria_libre_especifica,), axis=1)
-                    calidad_cemento_rango = rango_analizado['calidad_cemento'].value_counts(normalize=True) * 100
-
-                    # Verificar si calidad_cemento_rango está vacío
-                    if not calidad_cemento_rango.empty:
-                        resultado_predominante = calidad_cemento_rango.idxmax()
-                    else:
-                        resultado_predominante = "No disponible"
-
-                    resultados_predominantes.append(resultado_predominante)
+                # Estadísticas de todos los intervalos con búsqueda binaria sobre la profundidad ordenada
+                with medir('cbl.punzados'):
+                    indice_calidad = well_store.store.derivado(clave, 'cbl.indice_calidad', (amplitud_caneria_libre_especifica,),
+                                                               lambda: IndiceCalidad(depth, codigos))
+                    estadisticas_punzados = indice_calidad.consultar(pzdo_df['TOPE'], pzdo_df['BASE'], ampliacion_rango)
+                    resultados_predominantes = estadisticas_punzados['Resultado Predominante'].tolist()
 
                 pzdo_df['Resultado_Predominante'] = resultados_predominantes
 
@@ -164,42 +200,48 @@ def cbl(las_file, well_data, well_name):
                 st.write("Tabla de análisis de calidad de cemento en un rango de 5m del punzado:")
                 st.table(tabla_predominantes)
 
-                fig, ax = plt.subplots(figsize=(6, 8))
+                with st.expander("Porcentaje de cada calidad por punzado"):
+                    st.table(estadisticas_punzados)
 
-                cbl_smooth = savgol_filter(well_data['CBL'], window_length=5, polyorder=3)
+                with medir('cbl.grafico_punzados'):
+                    fig, ax = plt.subplots(figsize=(6, 8))
 
-                color = 'tab:red'
-                ax.set_xlabel('Amplitud de CBL')
-                ax.set_ylabel('Profundidad (DEPTH)')
-                ax.plot(cbl_smooth, well_data['DEPTH'], color=color, label='CBL (Suavizado)', linewidth=0.5)
-                ax.tick_params(axis='x', labelrotation=90)
-                ax.invert_yaxis()
+                    cbl_smooth = well_store.store.derivado(clave, 'cbl.suavizado', (5, 3),
+                                                           lambda: suavizar_cbl(cbl_values, window_length=5, polyorder=3))
 
-                # Ajustar la escala del eje y para que abarque todo el rango de profundidades
-                ax.set_xlim(0, 100)
-                ax.set_ylim(max_depth, min_depth)
+                    color = 'tab:red'
+                    ax.set_xlabel('Amplitud de CBL')
+                    ax.set_ylabel('Profundidad (DEPTH)')
+                    ax.plot(cbl_smooth, well_data['DEPTH'], color=color, label='CBL (Suavizado)', linewidth=0.5)
+                    ax.tick_params(axis='x', labelrotation=90)
+                    ax.invert_yaxis()
 
-                for index, row in pzdo_df.iterrows():
-                    tope_rango = row['TOPE'] - ampliacion_rango
-                    base_rango = row['BASE'] + ampliacion_rango
+                    # Ajustar la escala del eje y para que abarque todo el rango de profundidades
+                    ax.set_xlim(0, 100)
+                    ax.set_ylim(max_depth, min_depth)
 
-                    rango_analizado = well_data[(well_data['DEPTH'] >= tope_rango) & (well_data['DEPTH'] <= base_rango)]
+                    for index, row in pzdo_df.iterrows():
+                        tope_rango = row['TOPE'] - ampliacion_rango
+                        base_rango = row['BASE'] + ampliacion_rango
 
-                    resultado_predominante = row['Resultado_Predominante']
+                        resultado_predominante = row['Resultado_Predominante']
 
-                    color = 'green' if resultado_predominante == 'Bueno' else 'yellow' if resultado_predominante == 'Regular' else 'red'
+                        color = 'green' if resultado_predominante == 'Bueno' else 'yellow' if resultado_predominante == 'Regular' else 'red'
 
-                    ax.axhspan(tope_rango, base_rango, alpha=0.3, color=color, label=f'Rango - {resultado_predominante}')
+                        ax.axhspan(tope_rango, base_rango, alpha=0.3, color=color, label=f'Rango - {resultado_predominante}')
 
-                ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+                    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
 
-                st.pyplot(fig)
+                    st.pyplot(fig)
 
                 params = {
                     'Amplitud Cañería Libre Específica': amplitud_caneria_libre_especifica,
                     'TOC Teórico': toc_teorico,
-                    'Ampliación de Rango': ampliacion_rango
+                    'Ampliación de Rango': ampliacion_rango,
+                    'Método de TOC': metodo_toc
                 }
+                if banda_toc is not None:
+                    params['Banda de Confianza del TOC'] = f'{banda_toc[0]:.2f} m - {banda_toc[1]:.2f} m'
                 
                 # Asegurarse de que 'replace' solo se aplique si el valor es una cadena
                 def safe_replace_comma(value):
@@ -211,11 +253,9 @@ def cbl(las_file, well_data, well_name):
                 pzdo_df['TOPE'] = pzdo_df['TOPE'].apply(safe_replace_comma).astype(float)
                 pzdo_df['BASE'] = pzdo_df['BASE'].apply(safe_replace_comma).astype(float)
 
-                report_path = generate_report(well_data, toc_teorico, toc_calculado_rango, resultados_predominantes, tabla_predominantes, params, 'logo.png', well_name)
-                st.success(f'Reporte generado exitosamente: {report_path}')
-
-                # Extraer el nombre del archivo del path completo
-                report_filename = os.path.basename(report_path)
+                # El reporte se genera en memoria y se sirve directamente, sin archivos temporales
+                report_bytes = generate_report(well_data, toc_teorico, toc_calculado_rango, resultados_predominantes, tabla_predominantes, params, 'logo.png', well_name)
+                report_filename = nombre_reporte(well_name)
+                st.success(f'Reporte generado exitosamente: {report_filename}')
 
-                with open(report_path, "rb") as f:
-                    st.download_button('Descargar reporte', f, file_name=report_filename)
+                st.download_button('Descargar reporte', report_bytes, file_name=report_filename, mime='application/pdf')
@@ -0,0 +1,259 @@
+# Cálculos de calidad de cemento sobre arrays de NumPy, sin dependencias de Streamlit.
+
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_filter
+
+# Orden de las categorías: el código de cada muestra es su posición en esta lista
+CALIDADES = ['Bueno', 'Regular', 'Malo', 'SD']
+BUENO, REGULAR, MALO, SD = range(len(CALIDADES))
+
+# Métodos de estimación del TOC que se pueden elegir en la página de CBL
+METODOS_TOC = ['Promedio de muestras Malo', 'Transición (mediana por ventanas)']
+
+# Largo (m) de las ventanas de la mediana en estimar_toc_transicion
+VENTANA_TOC = 5.0
+
+
+def codigos_calidad_cemento(cbl_values, amplitud_caneria_libre_especifica):
+    """Clasifica la curva CBL con las mismas reglas que cbl.verificar_calidad_cemento y devuelve códigos int8.
+
+    Si se pasa un array de K amplitudes de cañería libre el resultado es una matriz (K, N),
+    una fila por umbral.
+    """
+    cbl_values = np.asarray(cbl_values, dtype=float)
+    amplitud = np.asarray(amplitud_caneria_libre_especifica, dtype=float)
+    if amplitud.ndim:
+        amplitud = amplitud[:, np.newaxis]
+
+    # Las condiciones se evalúan en el mismo orden que la versión por fila; las muestras
+    # NaN no cumplen ninguna y caen en "Regular", igual que antes.
+    condiciones = [
+        cbl_values < 0.1 * amplitud,
+        cbl_values > 0.5 * amplitud,
+        (0.1 * cbl_values <= cbl_values) & (cbl_values <= 0.5 * amplitud),
+        cbl_values == 0.0,
+    ]
+    return np.select(condiciones, [BUENO, MALO, REGULAR, SD], default=REGULAR).astype(np.int8)
+
+
+def clasificar_calidad_cemento(cbl_values, amplitud_caneria_libre_especifica):
+    """Devuelve la calidad de cemento de cada muestra como columna categórica."""
+    codigos = codigos_calidad_cemento(cbl_values, amplitud_caneria_libre_especifica)
+    return pd.Categorical.from_codes(codigos, categories=CALIDADES)
+
+
+def porcentajes_por_amplitud(cbl_values, amplitudes):
+    """Porcentaje de cada calidad para varias amplitudes de cañería libre en una sola pasada."""
+    amplitudes = np.atleast_1d(np.asarray(amplitudes, dtype=float))
+    codigos = codigos_calidad_cemento(cbl_values, amplitudes)
+    n_clases = len(CALIDADES)
+    desplazados = codigos + n_clases * np.arange(len(amplitudes))[:, np.newaxis]
+    conteos = np.bincount(desplazados.ravel(), minlength=n_clases * len(amplitudes))
+    conteos = conteos.reshape(len(amplitudes), n_clases)
+    total = max(codigos.shape[1], 1)
+    return pd.DataFrame(conteos * 100 / total, index=pd.Index(amplitudes, name='Amplitud'), columns=CALIDADES)
+
+
+def porcentajes_calidad(calidades):
+    """Porcentaje de cada calidad presente, ordenado de mayor a menor (como value_counts)."""
+    porcentajes = pd.Series(calidades).value_counts(normalize=True) * 100
+    return porcentajes[porcentajes > 0]
+
+
+class IndiceCalidad:
+    """Índice de profundidades ordenadas con conteos acumulados por calidad.
+
+    Se construye una vez por clasificación (O(N log N) solo si la profundidad no está
+    ordenada) y luego responde cada intervalo con dos búsquedas binarias.
+    """
+
+    def __init__(self, depth, codigos):
+        depth = np.asarray(depth, dtype=float)
+        codigos = np.asarray(codigos)
+        if depth.size > 1 and np.any(np.diff(depth) < 0):
+            orden = np.argsort(depth, kind='stable')
+            depth = depth[orden]
+            codigos = codigos[orden]
+        self.depth = depth
+        n_clases = len(CALIDADES)
+        self.acumulados = np.zeros((len(depth) + 1, n_clases), dtype=np.int64)
+        np.cumsum(codigos[:, np.newaxis] == np.arange(n_clases), axis=0, out=self.acumulados[1:])
+
+    def conteos(self, topes, bases, ampliacion_rango=0):
+        """Cantidad de muestras de cada calidad en [tope - ampliación, base + ampliación] para cada intervalo."""
+        topes = np.asarray(topes, dtype=float) - ampliacion_rango
+        bases = np.asarray(bases, dtype=float) + ampliacion_rango
+        inicio = np.searchsorted(self.depth, topes, side='left')
+        fin = np.maximum(np.searchsorted(self.depth, bases, side='right'), inicio)
+        return self.acumulados[fin] - self.acumulados[inicio]
+
+    def consultar(self, topes, bases, ampliacion_rango=0):
+        """Calidad predominante y porcentaje de cada calidad para K intervalos."""
+        conteos = self.conteos(topes, bases, ampliacion_rango)
+        total = conteos.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            porcentajes = conteos * 100 / total[:, np.newaxis]
+        predominante = np.array(CALIDADES, dtype=object)[conteos.argmax(axis=1)]
+        predominante[total == 0] = "No disponible"
+
+        resultado = pd.DataFrame({
+            'TOPE': np.asarray(topes, dtype=float),
+            'BASE': np.asarray(bases, dtype=float),
+            'Resultado Predominante': predominante,
+        })
+        for i, calidad in enumerate(CALIDADES):
+            resultado[f'% {calidad}'] = porcentajes[:, i]
+        return resultado
+
+
+def estimar_toc_promedio(depth, cbl_values, codigos, toc_teorico, n_muestras=10, cbl_minimo=10):
+    """TOC como promedio de las n_muestras 'Malo' más profundas con CBL > cbl_minimo por debajo del TOC teórico."""
+    depth = np.asarray(depth, dtype=float)
+    candidatos = depth[(depth >= toc_teorico) & (np.asarray(codigos) == MALO) & (np.asarray(cbl_values, dtype=float) > cbl_minimo)]
+    if candidatos.size == 0:
+        return np.nan
+    if candidatos.size > n_muestras:
+        candidatos = np.partition(candidatos, -n_muestras)[-n_muestras:]
+    return candidatos.mean()
+
+
+class ClasificacionIncremental:
+    """Resumen de calidad de un pozo que se recorre por bloques (ver las_io.LectorLAS).
+
+    Por bloque se guardan solo los conteos por calidad debajo del TOC teórico y las
+    n_muestras candidatas a TOC más profundas, así la memoria no depende del largo del pozo.
+    """
+
+    def __init__(self, amplitud_caneria_libre_especifica, toc_teorico, n_muestras=10, cbl_minimo=10):
+        self.amplitud = amplitud_caneria_libre_especifica
+        self.toc_teorico = toc_teorico
+        self.n_muestras = n_muestras
+        self.cbl_minimo = cbl_minimo
+        self.muestras = 0
+        self.conteos = np.zeros(len(CALIDADES), dtype=np.int64)
+        self.candidatos = np.empty(0)
+
+    def agregar(self, depth, cbl_values):
+        depth = np.asarray(depth, dtype=float)
+        cbl_values = np.asarray(cbl_values, dtype=float)
+        codigos = codigos_calidad_cemento(cbl_values, self.amplitud)
+        debajo = depth >= self.toc_teorico
+        self.muestras += len(depth)
+        self.conteos += np.bincount(codigos[debajo], minlength=len(CALIDADES))
+
+        # Mismo criterio que estimar_toc_promedio, quedándose con las más profundas vistas hasta ahora
+        candidatos = np.concatenate([self.candidatos, depth[debajo & (codigos == MALO) & (cbl_values > self.cbl_minimo)]])
+        if candidatos.size > self.n_muestras:
+            candidatos = np.partition(candidatos, -self.n_muestras)[-self.n_muestras:]
+        self.candidatos = candidatos
+
+    def resultado(self):
+        """Mismo diccionario que resumen_calidad."""
+        total = self.conteos.sum()
+        resumen = {'TOC Calculado': float(self.candidatos.mean()) if self.candidatos.size else np.nan}
+        for calidad, conteo in zip(CALIDADES, self.conteos):
+            resumen[f'% {calidad}'] = float(conteo * 100 / total) if total else 0.0
+        resumen['Resultado Predominante'] = CALIDADES[self.conteos.argmax()] if total else "No disponible"
+        return resumen
+
+
+def _mejor_corte(valores):
+    """Índice i que mejor separa valores[:i] (nivel alto) de valores[i:] (nivel bajo), y su puntaje.
+
+    Ajusta dos niveles constantes con sumas acumuladas, en O(n): el puntaje de cada corte es la
+    diferencia de medias ponderada por sqrt(i * (n - i) / n), positiva si arriba el nivel es mayor.
+    """
+    n = len(valores)
+    if n < 2:
+        return 0, -np.inf
+    acumulado = np.cumsum(valores)
+    i = np.arange(1, n)
+    arriba = acumulado[:-1] / i
+    abajo = (acumulado[-1] - acumulado[:-1]) / (n - i)
+    puntaje = (arriba - abajo) * np.sqrt(i * (n - i) / n)
+    mejor = int(np.argmax(puntaje))
+    return mejor + 1, puntaje[mejor]
+
+
+def estimar_toc_transicion(depth, cbl_values, amplitud_caneria_libre_especifica, ventana=VENTANA_TOC):
+    """TOC como la transición de cañería libre (CBL alto) a cañería cementada (CBL bajo), con banda de confianza.
+
+    La curva se divide en ventanas de unos `ventana` metros y de cada una se toman la mediana
+    y los cuartiles 25/75, así los picos aislados (cuplas) no mueven el resultado. El corte
+    con mayor salto entre las medianas de arriba y de abajo ubica la ventana de la transición
+    y el mismo criterio sobre las muestras de las dos ventanas vecinas da la profundidad. La
+    banda suma las ventanas contiguas cuyo rango intercuartil cruza el nivel medio
+    entre los dos tramos, y siempre incluye la ventana del TOC. Todo es O(N).
+
+    Devuelve un diccionario con 'toc', 'tope' y 'base' de la banda, 'nivel_libre' y
+    'nivel_cementado'; todo NaN si el salto es menor que el 10 % de la amplitud de cañería libre.
+    """
+    sin_transicion = {'toc': np.nan, 'tope': np.nan, 'base': np.nan, 'nivel_libre': np.nan, 'nivel_cementado': np.nan}
+    depth = np.asarray(depth, dtype=float)
+    cbl_values = np.asarray(cbl_values, dtype=float)
+    validos = np.isfinite(depth) & np.isfinite(cbl_values)
+    depth, cbl_values = depth[validos], cbl_values[validos]
+    if depth.size > 1 and np.any(np.diff(depth) < 0):
+        orden = np.argsort(depth, kind='stable')
+        depth, cbl_values = depth[orden], cbl_values[orden]
+    n = depth.size
+    if n < 4:
+        return sin_transicion
+
+    # Muestras por ventana según el paso típico del registro; al menos dos ventanas
+    paso = np.median(np.diff(depth)) if n > 1 else 0
+    k = int(np.clip(round(ventana / paso) if paso > 0 else 1, 2, n // 2))
+    completas = n // k
+    cuartiles = np.quantile(cbl_values[:completas * k].reshape(completas, k), [0.25, 0.5, 0.75], axis=1)
+    if n > completas * k:
+        cuartiles = np.column_stack([cuartiles, np.quantile(cbl_values[completas * k:], [0.25, 0.5, 0.75])])
+    q25, medianas, q75 = cuartiles
+    limites = np.append(np.arange(0, n, k), n)  # muestras [limites[j], limites[j + 1]) de la ventana j
+
+    corte, puntaje = _mejor_corte(medianas)
+    if puntaje <= 0:
+        return sin_transicion
+    nivel_libre, nivel_cementado = np.median(medianas[:corte]), np.median(medianas[corte:])
+    if nivel_libre - nivel_cementado < 0.1 * amplitud_caneria_libre_especifica:
+        return sin_transicion
+    umbral = (nivel_libre + nivel_cementado) / 2
+
+    # Profundidad: el mismo criterio sobre las muestras de las ventanas a cada lado del corte
+    inicio, fin = limites[corte - 1], limites[min(corte + 1, len(medianas))]
+    muestra, _ = _mejor_corte(cbl_values[inicio:fin])
+    toc = depth[inicio + muestra]
+
+    # Banda: la ventana del TOC más las contiguas con cuartiles a ambos lados del nivel medio
+    ambiguas = (q25 < umbral) & (q75 > umbral)
+    primera = (inicio + muestra) // k
+    ultima = primera + 1
+    while primera > 0 and ambiguas[primera - 1]:
+        primera -= 1
+    while ultima < len(medianas) and ambiguas[ultima]:
+        ultima += 1
+    tope, base = depth[limites[primera]], depth[limites[ultima] - 1]
+    return {'toc': float(toc), 'tope': float(tope), 'base': float(base),
+            'nivel_libre': float(nivel_libre), 'nivel_cementado': float(nivel_cementado)}
+
+
+def resumen_calidad(depth, cbl_values, amplitud_caneria_libre_especifica, toc_teorico):
+    """TOC calculado, porcentaje de cada calidad por debajo del TOC teórico y calidad predominante del pozo."""
+    clasificacion = ClasificacionIncremental(amplitud_caneria_libre_especifica, toc_teorico)
+    clasificacion.agregar(depth, cbl_values)
+    return clasificacion.resultado()
+
+
+def suavizar_cbl(cbl_values, window_length=5, polyorder=3):
+    """Suaviza la curva CBL con savgol_filter; los nulos se interpolan para filtrar y se devuelven como NaN."""
+    cbl_values = np.asarray(cbl_values, dtype=float)
+    nulos = np.isnan(cbl_values)
+    if nulos.all() or len(cbl_values) < window_length:
+        return cbl_values.copy()
+    if nulos.any():
+        posiciones = np.arange(len(cbl_values))
+        cbl_values = cbl_values.copy()
+        cbl_values[nulos] = np.interp(posiciones[nulos], posiciones[~nulos], cbl_values[~nulos])
+    suavizado = savgol_filter(cbl_values, window_length=window_length, polyorder=polyorder)
+    suavizado[nulos] = np.nan
+    return suavizado
@@ -0,0 +1,168 @@
+# Índice de cobertura: intervalos de datos válidos de cada curva, codificados por tramos.
+#
+# Una curva de N muestras suele tener unos pocos tramos con dato; se guardan solo los
+# índices de inicio y fin de cada tramo y las profundidades de sus bordes, calculados para
+# todas las curvas a la vez. El índice se puede armar con el pozo completo o recorriéndolo
+# por bloques, y en los dos casos su tamaño depende de la cantidad de tramos, no de N.
+
+import numpy as np
+import pandas as pd
+
+import well_store
+
+
+class IndiceCobertura:
+    """Tramos [inicio, fin) de muestras válidas de cada columna de un pozo de n muestras.
+
+    Para cada tramo se guardan también la profundidad de su primera y última muestra y sus
+    bordes, a mitad de camino con las muestras vecinas, para dibujarlos sin huecos.
+    """
+
+    def __init__(self, n, columnas, tramos, profundidades):
+        self.n = n
+        self.columnas = list(columnas)
+        self.tramos = tramos
+        self.profundidades = profundidades
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for arrays in [*self.tramos.values(), *self.profundidades.values()] for a in arrays)
+
+    @classmethod
+    def desde_dataframe(cls, well_data):
+        cobertura = CoberturaIncremental(well_data.columns)
+        cobertura.agregar(well_data['DEPTH'].to_numpy(dtype=float), well_data.notna().to_numpy())
+        return cobertura.resultado()
+
+    def muestras_validas(self, columna):
+        inicios, finales = self.tramos[columna]
+        return int((finales - inicios).sum())
+
+    def faltantes(self):
+        """Cantidad de muestras nulas por columna, como well_data.isnull().sum()."""
+        return pd.Series({col: self.n - self.muestras_validas(col) for col in self.columnas}, dtype=int)
+
+    def intervalos(self, columna):
+        """Intervalos de profundidad con dato de la curva (primera y última muestra de cada tramo)."""
+        topes, bases, _, _ = self.profundidades[columna]
+        return pd.DataFrame({'TOPE': topes, 'BASE': bases})
+
+    def mascara(self, columna):
+        """Máscara booleana de muestras válidas reconstruida a partir de los tramos."""
+        inicios, finales = self.tramos[columna]
+        cambios = np.zeros(self.n + 1, dtype=np.int32)
+        np.add.at(cambios, inicios, 1)
+        np.add.at(cambios, finales, -1)
+        return np.cumsum(cambios[:-1]) > 0
+
+    def rango_valido(self, columnas):
+        """(tope, base) del intervalo donde todas las columnas tienen dato entre su primera y última muestra.
+
+        Sirve para recortar un análisis a la profundidad cubierta por las curvas que usa; None
+        si alguna curva no tiene datos o los rangos no se superponen.
+        """
+        primero, ultimo = 0, self.n
+        tope = base = None
+        for columna in columnas:
+            inicios, finales = self.tramos[columna]
+            if len(inicios) == 0:
+                return None
+            topes, bases, _, _ = self.profundidades[columna]
+            if tope is None or inicios[0] > primero:
+                primero, tope = inicios[0], topes[0]
+            if base is None or finales[-1] < ultimo:
+                ultimo, base = finales[-1], bases[-1]
+        if tope is None or primero >= ultimo:
+            return None
+        return (min(tope, base), max(tope, base))
+
+    def poligonos(self, columna):
+        """Coordenadas x, y de un rectángulo por tramo (separados por None) para un go.Scatter con fill='toself'."""
+        _, _, arriba, abajo = self.profundidades[columna]
+        x = np.tile(np.array([0, 1, 1, 0, 0, None], dtype=object), len(arriba))
+        y = np.column_stack([arriba, arriba, abajo, abajo, arriba, np.full(len(arriba), None)]).ravel()
+        return x, y
+
+
+class CoberturaIncremental:
+    """Arma un IndiceCobertura a partir de bloques consecutivos de filas (ver las_io.LectorLAS).
+
+    De un bloque al siguiente solo se arrastran la validez y la profundidad de la última
+    fila, para unir los tramos que cruzan el borde; de cada tramo se guardan los índices y
+    las profundidades de sus bordes, así la memoria no crece con la cantidad de filas.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        self.n = 0
+        self._anterior = np.zeros(len(self.columnas), dtype=np.int8)
+        # Primeras y últimas dos profundidades, para extrapolar los bordes de los extremos
+        self._primeras = np.empty(0)
+        self._ultimas = np.empty(0)
+        self._inicios = []
+        self._finales = []
+
+    def agregar(self, depth, validos):
+        """Agrega un bloque: profundidades (filas,) y máscara de datos válidos (filas, columnas)."""
+        validos = np.asarray(validos, dtype=np.int8)
+        if len(validos) == 0:
+            return
+        depth = np.asarray(depth, dtype=float)
+        # Profundidad de la fila anterior a cada fila del bloque (NaN antes de la primera del pozo)
+        anteriores = np.concatenate([self._ultimas[-1:] if self.n else [np.nan], depth[:-1]])
+
+        # Un tramo empieza donde la máscara pasa de 0 a 1 y termina donde pasa de 1 a 0
+        cambios = np.diff(np.vstack([self._anterior, validos]), axis=0)
+        columna, fila = np.nonzero(cambios.T)
+        signo = cambios.T[columna, fila]
+        empieza, termina = signo == 1, signo == -1
+        medios = (anteriores[fila] + depth[fila]) / 2
+        self._inicios.append((columna[empieza], fila[empieza] + self.n, depth[fila[empieza]], medios[empieza]))
+        self._finales.append((columna[termina], fila[termina] + self.n, anteriores[fila[termina]], medios[termina]))
+
+        self._anterior = validos[-1].copy()
+        self._primeras = np.concatenate([self._primeras, depth[:2]])[:2]
+        self._ultimas = np.concatenate([self._ultimas, depth[-2:]])[-2:]
+        self.n += len(validos)
+
+    def _agrupar(self, partes):
+        """Por columna, la tupla de arrays (índices, profundidades, bordes) de los tramos de todas las partes."""
+        campos = [np.concatenate([parte[i] for parte in partes]) for i in range(4)]
+        # Orden estable por columna: dentro de cada columna los índices ya vienen crecientes
+        orden = np.argsort(campos[0], kind='stable')
+        columna, *valores = [campo[orden] for campo in campos]
+        cortes = np.searchsorted(columna, np.arange(len(self.columnas) + 1))
+        return [tuple(valor[a:b] for valor in valores) for a, b in zip(cortes[:-1], cortes[1:])]
+
+    def _extremos(self):
+        """Bordes por encima de la primera muestra y por debajo de la última, a medio paso."""
+        if self.n > 1:
+            return (self._primeras[0] - (self._primeras[1] - self._primeras[0]) / 2,
+                    self._ultimas[1] + (self._ultimas[1] - self._ultimas[0]) / 2)
+        if self.n == 1:
+            return self._primeras[0] - 0.5, self._primeras[0] + 0.5
+        return np.nan, np.nan
+
+    def resultado(self):
+        """IndiceCobertura de las filas agregadas; los tramos abiertos se cierran en la última fila."""
+        arriba, abajo = self._extremos()
+        vacio = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0), np.empty(0))
+        abiertas = np.flatnonzero(self._anterior)
+        cierre = (abiertas, np.full(len(abiertas), self.n, dtype=np.intp),
+                  np.full(len(abiertas), self._ultimas[-1] if self.n else np.nan), np.full(len(abiertas), abajo))
+        inicios = self._agrupar([vacio, *self._inicios])
+        finales = self._agrupar([vacio, *self._finales, cierre])
+
+        tramos, profundidades = {}, {}
+        for col, (filas_inicio, topes, medios_arriba), (filas_fin, bases, medios_abajo) in zip(self.columnas, inicios, finales):
+            # Los tramos que empiezan en la primera fila no tienen muestra anterior
+            bordes_arriba = np.where(filas_inicio == 0, arriba, medios_arriba)
+            tramos[col] = (filas_inicio, filas_fin)
+            profundidades[col] = (topes, bases, bordes_arriba, medios_abajo)
+        return IndiceCobertura(self.n, self.columnas, tramos, profundidades)
+
+
+def indice_cobertura(well_data):
+    """Índice de cobertura del pozo, calculado una vez por pozo almacenado."""
+    return well_store.store.derivado(well_store.clave_pozo(well_data), 'cobertura', (tuple(well_data.columns),),
+                                     lambda: IndiceCobertura.desde_dataframe(well_data))
@@ -1,7 +1,11 @@
 import streamlit as st
 import welly
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba
+from instrumentation import medir
+from welllog import WellLog
 
 def load_data(uploaded_file):
     if uploaded_file is not None:
@@ -10,39 +14,65 @@ def load_data(uploaded_file):
         return las_file, well_data
     return None, None
 
-def identify_cuplas(well_data, ccl_upper_limit_auto, dist_promedio=9.6, tolerancia=1):
+def agrupar_picos(depths, separacion_minima=1):
+    """Recorre los picos en orden y descarta los que quedan a separacion_minima o menos de un pico ya aceptado.
+
+    Un pico d se descarta si algún aceptado a cumple d - separacion_minima <= a <= d + separacion_minima,
+    con las mismas operaciones de punto flotante que la versión por fila: con picos a una
+    separación exacta (p. ej. 1 m con muestreo de 0.1 m) otra cuenta cambia la decisión.
+    """
+    depths = np.asarray(depths, dtype=float)
+    if depths.size == 0:
+        return depths
+
+    diferencias = np.diff(depths)
+    if np.all(diferencias >= 0) or np.all(diferencias <= 0):
+        # Profundidad monótona: el pico aceptado más cercano siempre es el último, así que
+        # basta saltar con búsqueda binaria al primer pico con d - separacion_minima > a.
+        # Con profundidad decreciente se niega todo: -(d + s) es exactamente (-d) - s.
+        signo = 1.0 if np.all(diferencias >= 0) else -1.0
+        ordenadas = signo * depths
+        limites = ordenadas - separacion_minima
+        aceptados = [0]
+        siguiente = np.searchsorted(limites, ordenadas[0], side='right')
+        while siguiente < len(ordenadas):
+            aceptados.append(siguiente)
+            siguiente = np.searchsorted(limites, ordenadas[siguiente], side='right')
+        return depths[aceptados]
+
+    # Profundidad desordenada: comparar contra los vecinos entre los picos ya aceptados
+    aceptados = []
+    for depth in depths:
+        pos = np.searchsorted(aceptados, depth)
+        if pos > 0 and aceptados[pos - 1] >= depth - separacion_minima:
+            continue
+        if pos < len(aceptados) and aceptados[pos] <= depth + separacion_minima:
+            continue
+        aceptados.insert(pos, depth)
+    return np.array(aceptados)
+
+def identify_cuplas(well_data, ccl_upper_limit_auto, dist_promedio=9.6, tolerancia=1, separacion_minima=1):
     well_data.reset_index(drop=True, inplace=True)
     well_data['EsCupla'] = well_data['CCL'] > ccl_upper_limit_auto
-    
-    cuplas_table = pd.DataFrame(columns=['Profundidad', 'Valido'])
-    
-    for idx, row in well_data.iterrows():
-        if row['EsCupla']:
-            window = well_data.iloc[:idx+1][well_data['DEPTH'] >= row['DEPTH'] - dist_promedio]
-            max_ccl = window['CCL'].max()
-            
-            next_point_idx = idx + 1
-            next_point = well_data.iloc[next_point_idx] if next_point_idx < len(well_data) else None
-            if next_point is not None and next_point['EsCupla'] and abs(next_point['DEPTH'] - row['DEPTH']) <= tolerancia:
-                continue
-            
-            if len(cuplas_table) > 0:
-                min_depth = row['DEPTH'] - 1
-                max_depth = row['DEPTH'] + 1
-                if ((cuplas_table['Profundidad'] >= min_depth) & (cuplas_table['Profundidad'] <= max_depth)).any():
-                    continue
-            
-            cuplas_table.loc[len(cuplas_table)] = {'Profundidad': row['DEPTH'], 'Valido': 'Valido'}
-    
-    cuplas_table = cuplas_table.sort_values(by='Profundidad', ascending=True).reset_index(drop=True)
+
+    es_cupla = well_data['EsCupla'].to_numpy(dtype=bool)
+    depth = well_data['DEPTH'].to_numpy(dtype=float)
+
+    # Dentro de un grupo de muestras consecutivas sobre el umbral solo cuenta la última
+    # (la siguiente muestra ya no es cupla o está a más de la tolerancia).
+    siguiente_es_cupla = np.zeros_like(es_cupla)
+    siguiente_es_cupla[:-1] = es_cupla[1:] & (np.abs(np.diff(depth)) <= tolerancia)
+    picos = depth[es_cupla & ~siguiente_es_cupla]
+
+    cuplas_table = pd.DataFrame({'Profundidad': np.sort(agrupar_picos(picos, separacion_minima)), 'Valido': 'Valido'})
     cuplas_table['Nro de Cupla'] = ['C.' + str(i) for i in range(1, len(cuplas_table) + 1)]
-    
+
     # Identificar los valores "SD" como anomalías
     sd_values = well_data[well_data['CCL'] == 'SD']
     if not sd_values.empty:
-        for idx, row in sd_values.iterrows():
-            cuplas_table.loc[len(cuplas_table)] = {'Profundidad': row['DEPTH'], 'Valido': 'SD'}
-    
+        cuplas_table = pd.concat([cuplas_table, pd.DataFrame({'Profundidad': sd_values['DEPTH'].to_numpy(), 'Valido': 'SD'})],
+                                 ignore_index=True)
+
     return cuplas_table
 
 def classify_cbl(cbl_value, max_cbl):
@@ -66,18 +96,60 @@ def colorize_cbl(cbl_category):
     else:
         return 'red'
 
+# Categorías de CBL en el orden de los códigos que devuelve codigos_cbl
+CATEGORIAS_CBL = ['LIBRE', 'AGARRE', 'CUPLA', 'CUERPO']
+
+# A partir de esta cantidad de muestras el track de CBL se dibuja como imagen
+MAX_MUESTRAS_SCATTER = 50000
+
+def codigos_cbl(cbl_values, max_cbl):
+    """Versión vectorizada de classify_cbl: devuelve el índice en CATEGORIAS_CBL de cada muestra."""
+    percentage = np.asarray(cbl_values, dtype=float) / max_cbl * 100
+    # Las muestras NaN no cumplen ninguna condición y quedan como CUERPO, igual que classify_cbl
+    return np.select([percentage >= 90, percentage >= 60, percentage >= 25], [0, 1, 2], default=3).astype(np.int8)
+
+def dibujar_categorias_cbl(ax, cbl_values, depths, codigos, x_range=(0, 100), max_muestras=MAX_MUESTRAS_SCATTER):
+    """Dibuja el track de CBL con una colección por categoría, o como imagen si el registro es muy denso."""
+    cbl_values = np.asarray(cbl_values, dtype=float)
+    depths = np.asarray(depths, dtype=float)
+    colores = [colorize_cbl(categoria) for categoria in CATEGORIAS_CBL]
+
+    if len(depths) <= max_muestras:
+        for codigo, color in enumerate(colores):
+            mask = codigos == codigo
+            if mask.any():
+                ax.scatter(cbl_values[mask], depths[mask], color=color, s=5)
+        return
+
+    # Registro denso: cada muestra pinta un píxel de una grilla de tamaño fijo, así el
+    # costo de dibujo no depende del largo del pozo.
+    alto, ancho = 2000, 400
+    depth_min, depth_max = np.nanmin(depths), np.nanmax(depths)
+    validos = np.isfinite(cbl_values) & np.isfinite(depths) & (cbl_values >= x_range[0]) & (cbl_values <= x_range[1])
+    fila = ((depths[validos] - depth_min) / max(depth_max - depth_min, 1e-12) * (alto - 1)).astype(np.intp)
+    columna = ((cbl_values[validos] - x_range[0]) / (x_range[1] - x_range[0]) * (ancho - 1)).astype(np.intp)
+
+    imagen = np.zeros((alto, ancho, 4))
+    imagen[fila, columna] = np.array([to_rgba(color) for color in colores])[codigos[validos]]
+    ax.imshow(imagen, extent=(x_range[0], x_range[1], depth_max, depth_min), origin='upper',
+              aspect='auto', interpolation='nearest')
+
 def highlight_cuplas(cuplas_table, well_data, ax, dist_promedio, tolerancia):
     last_valid_depth = None
     last_valid_cupla_depth = None
     first_detection = True  # Variable para indicar la primera detección
 
+    # Cada cupla es una muestra del registro: se busca por índice en vez de filtrar el pozo completo
+    log = WellLog.desde_dataframe(well_data, ['CBL'])
+    cbl_max = well_data['CBL'].max()
+
     for i, row in cuplas_table[::-1].iterrows():  # Iterar en orden inverso
         depth = row['Profundidad']
         label = row['Nro de Cupla']
         valid = True
 
         # Obtener el valor de CBL clasificado
-        cbl_classified = classify_cbl(well_data.loc[well_data['DEPTH'] == depth, 'CBL'].iloc[0], well_data['CBL'].max())
+        cbl_classified = classify_cbl(log['CBL'][log.indice(depth)], cbl_max)
 
         # Verificar si el valor de CBL clasificado es 'CUERPO'
         if cbl_classified == 'CUERPO':
@@ -104,27 +176,56 @@ def highlight_cuplas(cuplas_table, well_data, ax, dist_promedio, tolerancia):
 
     return cuplas_table
 
-def posibles_cortes(well_data_filtered, cuplas_table, ax):
-    cbl_max = well_data_filtered['CBL'].max()
-    posible_cortes = []
+def porcentajes_ventanas_cbl(depths, codigos, fines, longitud_ventana=4):
+    """Porcentaje de cada categoría de CBL en las ventanas (fin - longitud_ventana, fin], una fila por ventana.
+
+    Usa conteos acumulados sobre la profundidad ordenada, así que todas las ventanas se
+    resuelven en una sola pasada sin importar su largo.
+    """
+    depths = np.asarray(depths, dtype=float)
+    codigos = np.asarray(codigos)
+    if depths.size > 1 and np.any(np.diff(depths) < 0):
+        orden = np.argsort(depths, kind='stable')
+        depths, codigos = depths[orden], codigos[orden]
+
+    acumulados = np.zeros((len(depths) + 1, len(CATEGORIAS_CBL)), dtype=np.int64)
+    np.cumsum(codigos[:, np.newaxis] == np.arange(len(CATEGORIAS_CBL)), axis=0, out=acumulados[1:])
+
+    fines = np.asarray(fines, dtype=float)
+    inicio = np.searchsorted(depths, fines - longitud_ventana, side='right')
+    fin = np.maximum(np.searchsorted(depths, fines, side='right'), inicio)
+    conteos = acumulados[fin] - acumulados[inicio]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return conteos * 100 / conteos.sum(axis=1, keepdims=True)
+
+def tabla_cortes_candidatos(well_data_filtered, cuplas_table, longitud_ventana=4):
+    """Porcentaje de AGARRE y LIBRE en la ventana sobre cada cupla válida, de la más profunda a la más somera."""
+    cuplas_validas = cuplas_table[cuplas_table['Valido'] == 'Valido'].sort_values(by='Profundidad', ascending=False)
+    fines = cuplas_validas['Profundidad'].to_numpy(dtype=float)
+
+    codigos = codigos_cbl(well_data_filtered['CBL'].to_numpy(), well_data_filtered['CBL'].max())
+    porcentajes = porcentajes_ventanas_cbl(well_data_filtered['DEPTH'].to_numpy(), codigos, fines, longitud_ventana)
+    agarre = porcentajes[:, CATEGORIAS_CBL.index('AGARRE')]
+    libre = porcentajes[:, CATEGORIAS_CBL.index('LIBRE')]
+
+    return pd.DataFrame({
+        'Nro de Cupla': cuplas_validas['Nro de Cupla'].to_numpy(),
+        'Inicio Rango': fines - longitud_ventana,
+        'Fin Rango': fines,
+        'Porcentaje Agarre': agarre,
+        'Porcentaje Libre': libre,
+        'Posible Corte': libre > agarre,
+    })
+
+def posibles_cortes(well_data_filtered, cuplas_table, ax, longitud_ventana=4):
+    candidatos = tabla_cortes_candidatos(well_data_filtered, cuplas_table, longitud_ventana)
+    candidatos = candidatos[candidatos['Posible Corte']]
+    posible_cortes = [
+        {'Inicio Rango': row['Inicio Rango'], 'Fin Rango': row['Fin Rango'], 'Porcentaje Agarre': row['Porcentaje Agarre'],
+         'Porcentaje Libre': row['Porcentaje Libre'], 'Cupla Identificada': 'SI'}
+        for _, row in candidatos.iterrows()
+    ]
 
-    cupla_indices = cuplas_table.index[cuplas_table['Valido'] == 'Valido'].tolist()
-    cupla_indices.sort(key=lambda x: cuplas_table.loc[x, 'Profundidad'], reverse=True)
-    
-    for i, cupla_idx in enumerate(cupla_indices):
-        cupla_depth = cuplas_table.loc[cupla_idx, 'Profundidad']
-        
-        depth_range = well_data_filtered[(well_data_filtered['DEPTH'] <= cupla_depth) & (well_data_filtered['DEPTH'] > cupla_depth - 4)]
-        
-        agarre_percentage = (depth_range['CBL'].apply(lambda x: classify_cbl(x, cbl_max)) == 'AGARRE').mean() * 100
-        libre_percentage = (depth_range['CBL'].apply(lambda x: classify_cbl(x, cbl_max)) == 'LIBRE').mean() * 100
-        
-        if libre_percentage > agarre_percentage:
-            proposed_cupla_idx = cupla_idx
-            inicio_rango = cupla_depth - 4
-            fin_rango = cupla_depth
-            posible_cortes.append({'Inicio Rango': inicio_rango, 'Fin Rango': fin_rango, 'Porcentaje Agarre': agarre_percentage, 'Porcentaje Libre': libre_percentage, 'Cupla Identificada': 'SI'})
-    
     if posible_cortes:
         posible_corte_valido = max(posible_cortes, key=lambda x: x['Fin Rango'])
         proposed_cupla_depth = posible_corte_valido['Fin Rango']
@@ -147,6 +248,7 @@ def corte(las_file, well_data):
 
     gain_percentage = st.sidebar.number_input('Umbral [%]', value=15, min_value=0, max_value=100, step=1)
     Gain = gain_percentage / 100
+    longitud_ventana = st.sidebar.number_input('Ventana de análisis [m]', value=4.0, min_value=0.5, max_value=50.0, step=0.5)
 
     min_ccl = well_data['CCL'].min()
     mean_ccl = well_data['CCL'].mean()
@@ -160,12 +262,13 @@ def corte(las_file, well_data):
         st.error('No se encontraron datos válidos para iniciar el análisis.')
         return
 
-    cuplas_table = identify_cuplas(well_data, ccl_upper_limit_auto)
+    with medir('corte.cuplas'):
+        cuplas_table = identify_cuplas(well_data, ccl_upper_limit_auto)
 
     start_depth = cuplas_table['Profundidad'].min()
     end_depth = cuplas_table['Profundidad'].max()
 
-    well_data_filtered = well_data[(well_data['DEPTH'] >= start_depth) & (well_data['DEPTH'] <= end_depth)]
+    well_data_filtered = well_data.iloc[WellLog.desde_dataframe(well_data, []).ventana(start_depth, end_depth)]
     well_data_filtered = well_data_filtered.rename(columns={'CBL': 'CBL', 'CCL': 'CCL'})
 
     fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(8, 16))
@@ -179,45 +282,50 @@ def corte(las_file, well_data):
     axes[0].axvline(x=ccl_upper_limit_auto, color='gray', linestyle='--')
     axes[0].axvline(x=ccl_lower_limit_auto, color='gray', linestyle='--')
 
-    cuplas_table = identify_cuplas(well_data_filtered, ccl_upper_limit_auto)
+    with medir('corte.cuplas_intervalo'):
+        cuplas_table = identify_cuplas(well_data_filtered, ccl_upper_limit_auto)
     cupla_count = highlight_cuplas(cuplas_table, well_data_filtered, axes[0], dist_promedio=9.6, tolerancia=1)
 
-    posibles_cortes(well_data_filtered, cuplas_table, axes[0])  # Se llama a la función sin almacenar el resultado
+    with medir('corte.cortes'):
+        posibles_cortes(well_data_filtered, cuplas_table, axes[0], longitud_ventana)  # Se llama a la función sin almacenar el resultado
 
-    cbl_max = well_data_filtered['CBL'].max()
-    for i, row in well_data_filtered.iterrows():
-        cbl_category = classify_cbl(row['CBL'], cbl_max)
-        color = colorize_cbl(cbl_category)
-        axes[1].scatter(row['CBL'], row['DEPTH'], color=color, s=5)
+    with medir('corte.grafico'):
+        cbl_max = well_data_filtered['CBL'].max()
+        codigos = codigos_cbl(well_data_filtered['CBL'].to_numpy(), cbl_max)
+        dibujar_categorias_cbl(axes[1], well_data_filtered['CBL'].to_numpy(), well_data_filtered['DEPTH'].to_numpy(), codigos)
 
-    axes[1].set_xlim(0, 100)
-    axes[1].set_xlabel('Amplitud CBL')
-    axes[1].set_ylabel('Profundidad')
-    axes[1].invert_yaxis()
+        axes[1].set_xlim(0, 100)
+        axes[1].set_xlabel('Amplitud CBL')
+        axes[1].set_ylabel('Profundidad')
+        axes[1].set_ylim(well_data_filtered['DEPTH'].max(), well_data_filtered['DEPTH'].min())
 
-    plt.tight_layout()
+        plt.tight_layout()
 
-    # Obtener el nombre del pozo del archivo LAS
-    well_name = las_file.well.WELL.value if hasattr(las_file, 'well') and 'WELL' in las_file.well.keys() else "SD"
-    fig.suptitle(f'POZO - {well_name}', fontsize=16, fontweight='bold')
+        # Obtener el nombre del pozo del archivo LAS
+        well_name = las_file.well.WELL.value if hasattr(las_file, 'well') and 'WELL' in las_file.well.keys() else "SD"
+        fig.suptitle(f'POZO - {well_name}', fontsize=16, fontweight='bold')
 
-    # Cuadro de leyenda de colores de CBL
-    legend_elements = [
-        plt.Line2D([0], [0], marker='o', color='w', label='LIBRE', markerfacecolor='green', markersize=5),
-        plt.Line2D([0], [0], marker='o', color='w', label='AGARRE', markerfacecolor='orange', markersize=5),
-        plt.Line2D([0], [0], marker='o', color='w', label='CUPLA', markerfacecolor='blue', markersize=5),
-        plt.Line2D([0], [0], marker='o', color='w', label='CUERPO', markerfacecolor='red', markersize=5)
-    ]
+        # Cuadro de leyenda de colores de CBL
+        legend_elements = [
+            plt.Line2D([0], [0], marker='o', color='w', label='LIBRE', markerfacecolor='green', markersize=5),
+            plt.Line2D([0], [0], marker='o', color='w', label='AGARRE', markerfacecolor='orange', markersize=5),
+            plt.Line2D([0], [0], marker='o', color='w', label='CUPLA', markerfacecolor='blue', markersize=5),
+            plt.Line2D([0], [0], marker='o', color='w', label='CUERPO', markerfacecolor='red', markersize=5)
+        ]
 
-    # Ajustar leyenda al gráfico y colocarla en la esquina inferior derecha fuera del gráfico
-    fig.legend(handles=legend_elements, loc='lower right', fontsize='small', title='CBL Categories')
-    plt.subplots_adjust(top=0.92, bottom=0.08, left=0.10, right=0.90, hspace=0.25, wspace=0.35)
+        # Ajustar leyenda al gráfico y colocarla en la esquina inferior derecha fuera del gráfico
+        fig.legend(handles=legend_elements, loc='lower right', fontsize='small', title='CBL Categories')
+        plt.subplots_adjust(top=0.92, bottom=0.08, left=0.10, right=0.90, hspace=0.25, wspace=0.35)
 
-    st.pyplot(fig)
+        st.pyplot(fig)
     
     # Desplegable para la tabla de cuplas identificadas
     with st.expander("Tabla de Cuplas Identificadas"):
         st.table(cuplas_table)
+
+    # Desplegable con el puntaje de todas las cuplas como posibles puntos de corte
+    with st.expander("Puntos de Corte Candidatos"):
+        st.dataframe(tabla_cortes_candidatos(well_data_filtered, cuplas_table, longitud_ventana))
     
     # Desplegable para mostrar solo los valores detectados como "SD"
     with st.expander("Anomalías Identificadas"):
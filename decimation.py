@@ -0,0 +1,85 @@
+# Diezmado de tracks de registros para gráficos de Plotly.
+#
+# Se conserva el mínimo y el máximo de cada balde de profundidad, así los picos
+# siguen visibles aunque se envíe al navegador una fracción de las muestras.
+# Los crossplots usan en cambio una submuestra al azar, que respeta la distribución conjunta.
+
+import numpy as np
+
+# Puntos por track: dos (mínimo y máximo) por cada píxel de alto de la figura
+ALTO_FIGURA_PX = 1000
+MAX_PUNTOS_TRACK = 2 * ALTO_FIGURA_PX
+
+
+def indices_minmax(values, max_puntos=MAX_PUNTOS_TRACK):
+    """Índices de las filas que contienen el mínimo y el máximo de cada balde.
+
+    values puede ser una curva (N,) o varias (N, C); en ese caso se conservan los
+    extremos de todas las columnas. Los NaN se ignoran y los índices salen ordenados.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    n = values.shape[0]
+    n_baldes = max(max_puntos // (2 * values.shape[1]), 1)
+    if n <= 2 * n_baldes * values.shape[1]:
+        return np.arange(n)
+
+    # Baldes de igual cantidad de muestras; el último se completa con NaN
+    tamano = -(-n // n_baldes)
+    relleno = np.full((n_baldes * tamano - n, values.shape[1]), np.nan)
+    baldes = np.concatenate([values, relleno]).reshape(n_baldes, tamano, values.shape[1])
+
+    inicio = (np.arange(n_baldes) * tamano)[:, np.newaxis]
+    vacios = np.all(np.isnan(baldes), axis=1)
+    sin_nan = np.where(np.isnan(baldes), np.inf, baldes)
+    minimos = np.argmin(sin_nan, axis=1) + inicio
+    sin_nan = np.where(np.isnan(baldes), -np.inf, baldes)
+    maximos = np.argmax(sin_nan, axis=1) + inicio
+
+    # Los baldes sin datos aportan una sola fila para que el hueco se siga viendo
+    indices = np.concatenate([minimos[~vacios], maximos[~vacios], inicio.repeat(values.shape[1], axis=1)[vacios]])
+    return np.unique(indices[indices < n])
+
+
+def ventana_profundidad(depth, top=None, bottom=None):
+    """Slice de las muestras entre top y bottom (profundidad creciente o decreciente)."""
+    depth = np.asarray(depth, dtype=float)
+    if depth.size == 0:
+        return slice(0, 0)
+    top = depth.min() if top is None else top
+    bottom = depth.max() if bottom is None else bottom
+    if depth[0] <= depth[-1]:
+        return slice(np.searchsorted(depth, top, side='left'), np.searchsorted(depth, bottom, side='right'))
+    inicio = len(depth) - np.searchsorted(depth[::-1], bottom, side='right')
+    fin = len(depth) - np.searchsorted(depth[::-1], top, side='left')
+    return slice(inicio, fin)
+
+
+def indices_aleatorios(validos, max_puntos, semilla=0):
+    """Índices ordenados de hasta max_puntos filas válidas elegidas al azar, sin reemplazo.
+
+    La semilla fija hace que el mismo pozo y la misma ventana den siempre los mismos puntos.
+    """
+    indices = np.flatnonzero(validos)
+    if len(indices) <= max_puntos:
+        return indices
+    return np.sort(np.random.default_rng(semilla).choice(indices, max_puntos, replace=False))
+
+
+def submuestrear(well_data, columnas, max_puntos):
+    """Filas de well_data con dato en todas las columnas, submuestreadas al azar para un crossplot."""
+    validos = well_data[list(columnas)].notna().all(axis=1).to_numpy()
+    return well_data.iloc[indices_aleatorios(validos, max_puntos)]
+
+
+def diezmar(well_data, columnas, top=None, bottom=None, max_puntos=MAX_PUNTOS_TRACK):
+    """Filas de well_data dentro de la ventana de profundidad, diezmadas conservando los extremos de las columnas.
+
+    Sin top ni bottom se diezma well_data completo (por ejemplo, una ventana ya recortada con WellLog).
+    """
+    ventana = well_data
+    if top is not None or bottom is not None:
+        ventana = well_data.iloc[ventana_profundidad(well_data['DEPTH'].to_numpy(), top, bottom)]
+    indices = indices_minmax(ventana[list(columnas)].to_numpy(dtype=float), max_puntos)
+    return ventana.iloc[indices]
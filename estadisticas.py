@@ -0,0 +1,305 @@
+# Estadísticas, histogramas y KDE de todas las curvas de un pozo, con costo acotado.
+#
+# Cada curva se recorre una sola vez: se agrupa en una grilla fina de baldes y de ahí
+# salen el histograma (sumando baldes) y el KDE (convolucionando la grilla con un núcleo
+# gaussiano), así el costo es O(N) por curva sin importar cuántas muestras tenga.
+# La correlación entre curvas se arma con productos de matrices en float32.
+# EstadisticasIncrementales hace lo mismo recorriendo el pozo por bloques en dos pasadas.
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from decimation import ventana_profundidad
+from las_io import NULO_LAS
+
+BINS_HISTOGRAMA = 30
+
+# Baldes de la grilla fina por cada balde del histograma (los bordes coinciden)
+SUBDIVISIONES_KDE = 16
+
+# Muestras por defecto para la correlación; con más se toma una de cada k filas
+MAX_MUESTRAS_CORRELACION = 200000
+
+
+def valores_validos(values):
+    """Valores finitos de la curva, sin el nulo de los .LAS."""
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values) & (values != NULO_LAS)]
+
+
+def kde_agrupado(conteos_finos, ancho_fino, desvio, n):
+    """KDE gaussiano sobre la grilla fina con el ancho de banda de Scott (el de scipy y seaborn).
+
+    Devuelve la densidad multiplicada por n, es decir, muestras por unidad de la curva.
+    """
+    if n < 2 or desvio == 0:
+        return np.zeros(len(conteos_finos))
+    sigma = desvio * n ** (-1 / 5) / ancho_fino
+    radio = int(min(np.ceil(4 * sigma), len(conteos_finos)))
+    nucleo = np.exp(-0.5 * (np.arange(-radio, radio + 1) / sigma) ** 2)
+    nucleo /= nucleo.sum()
+    return np.convolve(conteos_finos, nucleo, mode='same') / ancho_fino
+
+
+def rango_grilla(minimo, maximo):
+    """Extremos de la grilla fina; una curva constante ocupa un balde de ancho 1 centrado en su valor."""
+    if minimo == maximo:
+        return minimo - 0.5, maximo + 0.5
+    return minimo, maximo
+
+
+def conteos_grilla(values, minimo, maximo, n_finos):
+    """Muestras en cada balde fino de [minimo, maximo]; el máximo cae en el último balde."""
+    ancho_fino = (maximo - minimo) / n_finos
+    indices = np.minimum(((values - minimo) / ancho_fino).astype(np.int64), n_finos - 1)
+    return np.bincount(indices, minlength=n_finos)
+
+
+class HistogramaCurva:
+    """Histograma y KDE de una curva; kde está en muestras por balde del histograma, como en seaborn."""
+
+    def __init__(self, values, bins=BINS_HISTOGRAMA):
+        values = valores_validos(values)
+        if len(values) == 0:
+            self._armar(None, None, None, 0, 0, bins)
+            return
+        minimo, maximo = rango_grilla(values.min(), values.max())
+        # Una sola pasada: índice del balde fino de cada muestra
+        conteos_finos = conteos_grilla(values, minimo, maximo, bins * SUBDIVISIONES_KDE)
+        self._armar(conteos_finos, minimo, maximo, values.std(), len(values), bins)
+
+    @classmethod
+    def desde_conteos(cls, conteos_finos, minimo, maximo, desvio, n, bins=BINS_HISTOGRAMA):
+        """Histograma a partir de la grilla fina ya contada (minimo y maximo como los de rango_grilla)."""
+        histograma = cls.__new__(cls)
+        histograma._armar(conteos_finos, minimo, maximo, desvio, n, bins)
+        return histograma
+
+    def _armar(self, conteos_finos, minimo, maximo, desvio, n, bins):
+        self.n = n
+        self.bins = bins
+        if n == 0:
+            self.bordes = self.conteos = self.grilla = self.kde = None
+            return
+        n_finos = bins * SUBDIVISIONES_KDE
+        ancho_fino = (maximo - minimo) / n_finos
+        self.bordes = np.linspace(minimo, maximo, bins + 1)
+        self.conteos = conteos_finos.reshape(bins, SUBDIVISIONES_KDE).sum(axis=1)
+        self.grilla = minimo + (np.arange(n_finos) + 0.5) * ancho_fino
+        self.kde = kde_agrupado(conteos_finos, ancho_fino, desvio, n) * ancho_fino * SUBDIVISIONES_KDE
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in [self.bordes, self.conteos, self.grilla, self.kde] if a is not None)
+
+
+def describir(values):
+    """Mismas filas que pandas.describe() para una curva, ignorando nulos y -999.25."""
+    values = valores_validos(values)
+    if len(values) == 0:
+        return [0, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan]
+    cuartiles = np.percentile(values, [25, 50, 75])
+    desvio = values.std(ddof=1) if len(values) > 1 else np.nan
+    return [len(values), values.mean(), desvio, values.min(), *cuartiles, values.max()]
+
+
+FILAS_DESCRIPCION = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+class EstadisticasCurvas:
+    """Descripción, histograma y KDE de cada curva numérica de un pozo."""
+
+    def __init__(self, well_data, bins=BINS_HISTOGRAMA):
+        numericas = well_data.select_dtypes('number')
+        self.columnas = list(numericas.columns)
+        self.histogramas = {}
+        descripcion = {}
+        for columna in self.columnas:
+            values = numericas[columna].to_numpy(dtype=float)
+            descripcion[columna] = describir(values)
+            self.histogramas[columna] = HistogramaCurva(values, bins)
+        self.descripcion = pd.DataFrame(descripcion, index=FILAS_DESCRIPCION, columns=self.columnas)
+
+    @property
+    def nbytes(self):
+        return sum(h.nbytes for h in self.histogramas.values()) + int(self.descripcion.memory_usage().sum())
+
+
+def cuantiles_grilla(conteos_finos, minimo, maximo, cuantiles):
+    """Cuantiles interpolados dentro de la grilla fina; el error es menor que el ancho de un balde."""
+    acumulados = np.cumsum(conteos_finos)
+    ancho_fino = (maximo - minimo) / len(conteos_finos)
+    objetivo = np.asarray(cuantiles, dtype=float) * acumulados[-1]
+    balde = np.minimum(np.searchsorted(acumulados, objetivo, side='left'), len(conteos_finos) - 1)
+    previos = np.where(balde > 0, acumulados[balde - 1], 0)
+    fraccion = (objetivo - previos) / np.maximum(conteos_finos[balde], 1)
+    return minimo + (balde + np.clip(fraccion, 0, 1)) * ancho_fino
+
+
+class EstadisticasIncrementales:
+    """Mismo resultado que EstadisticasCurvas recorriendo las curvas por bloques (ver las_io.LectorLAS).
+
+    Hace falta recorrer el pozo dos veces: la primera (agregar_momentos) junta cantidad,
+    media, varianza, mínimo y máximo de cada columna, que fijan la grilla fina; la segunda
+    (agregar_conteos) cuenta las muestras por balde. Los cuartiles salen de la grilla.
+    """
+
+    def __init__(self, columnas, bins=BINS_HISTOGRAMA):
+        self.columnas = list(columnas)
+        self.bins = bins
+        k = len(self.columnas)
+        self.n = np.zeros(k, dtype=np.int64)
+        self.media = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.minimo = np.full(k, np.inf)
+        self.maximo = np.full(k, -np.inf)
+        self.conteos_finos = None
+
+    @staticmethod
+    def _validos(matriz):
+        matriz = np.array(matriz, dtype=float)
+        matriz[~np.isfinite(matriz) | (matriz == NULO_LAS)] = np.nan
+        return matriz
+
+    def agregar_momentos(self, matriz):
+        """Primera pasada: un bloque (filas, columnas)."""
+        matriz = self._validos(matriz)
+        n_bloque = np.sum(~np.isnan(matriz), axis=0)
+        if not n_bloque.any():
+            return
+        with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            media_bloque = np.nan_to_num(np.nanmean(matriz, axis=0))
+            m2_bloque = np.nan_to_num(np.nansum((matriz - media_bloque) ** 2, axis=0))
+            self.minimo = np.fmin(self.minimo, np.nanmin(matriz, axis=0))
+            self.maximo = np.fmax(self.maximo, np.nanmax(matriz, axis=0))
+
+        # Combinación de medias y varianzas por grupos (Chan et al.), estable aunque haya muchos bloques
+        total = self.n + n_bloque
+        delta = media_bloque - self.media
+        with np.errstate(invalid='ignore', divide='ignore'):
+            peso = np.where(total > 0, n_bloque / np.maximum(total, 1), 0)
+        self.media = self.media + delta * peso
+        self.m2 = self.m2 + m2_bloque + delta ** 2 * self.n * peso
+        self.n = total
+
+    def agregar_conteos(self, matriz):
+        """Segunda pasada: un bloque (filas, columnas), después de recorrer todo el pozo con agregar_momentos."""
+        n_finos = self.bins * SUBDIVISIONES_KDE
+        if self.conteos_finos is None:
+            self.conteos_finos = np.zeros((len(self.columnas), n_finos), dtype=np.int64)
+        matriz = self._validos(matriz)
+        for i in np.flatnonzero(self.n):
+            values = matriz[:, i]
+            values = values[~np.isnan(values)]
+            if len(values):
+                minimo, maximo = rango_grilla(self.minimo[i], self.maximo[i])
+                self.conteos_finos[i] += conteos_grilla(values, minimo, maximo, n_finos)
+
+    def resultado(self):
+        """EstadisticasCurvas con la descripción y los histogramas de las columnas recorridas."""
+        estadisticas = EstadisticasCurvas.__new__(EstadisticasCurvas)
+        estadisticas.columnas = self.columnas
+        estadisticas.histogramas = {}
+        descripcion = {}
+        for i, columna in enumerate(self.columnas):
+            n = int(self.n[i])
+            if n == 0 or self.conteos_finos is None:
+                descripcion[columna] = describir([])
+                estadisticas.histogramas[columna] = HistogramaCurva([], self.bins)
+                continue
+            minimo, maximo = rango_grilla(self.minimo[i], self.maximo[i])
+            cuartiles = np.clip(cuantiles_grilla(self.conteos_finos[i], minimo, maximo, [0.25, 0.5, 0.75]),
+                                self.minimo[i], self.maximo[i])
+            desvio = np.sqrt(self.m2[i] / (n - 1)) if n > 1 else np.nan
+            descripcion[columna] = [n, self.media[i], desvio, self.minimo[i], *cuartiles, self.maximo[i]]
+            estadisticas.histogramas[columna] = HistogramaCurva.desde_conteos(
+                self.conteos_finos[i], minimo, maximo, np.sqrt(self.m2[i] / n), n, self.bins)
+        estadisticas.descripcion = pd.DataFrame(descripcion, index=FILAS_DESCRIPCION, columns=self.columnas)
+        return estadisticas
+
+
+def estadisticas_por_bloques(lector, bins=BINS_HISTOGRAMA):
+    """EstadisticasCurvas de un las_io.LectorLAS, recorriendo el archivo dos veces con memoria acotada."""
+    estadisticas = EstadisticasIncrementales(lector.columnas, bins)
+    for bloque in lector.bloques():
+        estadisticas.agregar_momentos(bloque)
+    for bloque in lector.bloques():
+        estadisticas.agregar_conteos(bloque)
+    return estadisticas.resultado()
+
+
+def matriz_curvas(well_data, tope=None, base=None, max_muestras=None):
+    """Curvas numéricas como matriz float32 (N, C) con NaN en los nulos.
+
+    Opcionalmente se limita a la ventana de profundidad [tope, base] y se submuestrea
+    tomando una de cada k filas para no superar max_muestras.
+    """
+    numericas = well_data.select_dtypes('number')
+    if tope is not None or base is not None:
+        numericas = numericas.iloc[ventana_profundidad(well_data['DEPTH'].to_numpy(), tope, base)]
+    if max_muestras and len(numericas) > max_muestras:
+        numericas = numericas.iloc[::-(-len(numericas) // max_muestras)]
+    matriz = numericas.to_numpy(dtype=np.float32, copy=True)
+    matriz[~np.isfinite(matriz) | (matriz == NULO_LAS)] = np.nan
+    return list(numericas.columns), matriz
+
+
+def correlacion(matriz, metodo='pearson'):
+    """Correlación de Pearson o Spearman entre las columnas de matriz, con nulos descartados por par.
+
+    Equivale a DataFrame.corr(): cada par usa solo las filas donde ambas curvas tienen
+    dato. Las sumas por par salen de productos de matrices en float32 sobre las curvas
+    ya centradas y escaladas (para no perder precisión), y el cierre se hace en float64.
+    En Spearman los rangos se calculan una vez por curva y no por par, así que difiere
+    de pandas cuando las curvas tienen nulos en filas distintas.
+    """
+    matriz = np.asarray(matriz, dtype=np.float32)
+    if metodo == 'spearman':
+        matriz = pd.DataFrame(matriz).rank().to_numpy(dtype=np.float32)
+    elif metodo != 'pearson':
+        raise ValueError(f"Método de correlación desconocido: {metodo}")
+
+    validos = ~np.isnan(matriz)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        medias = np.nanmean(matriz, axis=0)
+        desvios = np.nanstd(matriz, axis=0)
+    desvios[~(desvios > 0)] = 1
+    x = np.where(validos, (matriz - np.nan_to_num(medias)) / desvios, 0).astype(np.float32)
+    m = validos.astype(np.float32)
+
+    n = (m.T @ m).astype(np.float64)
+    suma = (x.T @ m).astype(np.float64)                # suma[i, j]: suma de la curva i donde j tiene dato
+    suma_cuadrados = ((x * x).T @ m).astype(np.float64)
+    productos = (x.T @ x).astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covarianza = productos - suma * suma.T / n
+        varianza = suma_cuadrados - suma ** 2 / n
+        r = covarianza / np.sqrt(varianza * varianza.T)
+    r[(n < 2) | ~(varianza > 0) | ~(varianza.T > 0)] = np.nan
+    return np.clip(r, -1, 1)
+
+
+def correlacion_curvas(well_data, metodo='pearson', tope=None, base=None, max_muestras=MAX_MUESTRAS_CORRELACION):
+    """Matriz de correlación de las curvas numéricas del pozo como DataFrame."""
+    columnas, matriz = matriz_curvas(well_data, tope, base, max_muestras)
+    return pd.DataFrame(correlacion(matriz, metodo), index=columnas, columns=columnas)
+
+
+def pares_mas_correlacionados(matriz_correlacion, k=10):
+    """Los k pares de curvas distintas con mayor correlación en valor absoluto."""
+    valores = matriz_correlacion.to_numpy()
+    filas, columnas = np.triu_indices(len(valores), k=1)
+    r = valores[filas, columnas]
+    validos = ~np.isnan(r)
+    filas, columnas, r = filas[validos], columnas[validos], r[validos]
+    orden = np.argsort(-np.abs(r), kind='stable')[:k]
+    nombres = np.asarray(matriz_correlacion.columns, dtype=object)
+    return pd.DataFrame({
+        'Curva 1': nombres[filas[orden]],
+        'Curva 2': nombres[columnas[orden]],
+        'Correlación': r[orden],
+    })
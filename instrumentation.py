@@ -0,0 +1,181 @@
+# Instrumentación liviana por etapa: tiempo de pared, tiempo de CPU y pico de memoria.
+#
+# Uso:
+#   with medir('cbl.clasificacion'):
+#       ...
+#
+#   @instrumentado('generate_report')
+#   def generate_report(...):
+#       ...
+#
+# Los registros de cada rerun se guardan por hilo (cada sesión de Streamlit corre en su
+# propio hilo) y, si hay un log configurado, se agregan como JSON lines. La memoria y el
+# log del panel solo se activan en los reruns que lo piden (ver sesion()).
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+# Log por defecto cuando se activa el panel; LAS_PERF_LOG fija otro archivo y lo activa siempre
+LOG_POR_DEFECTO = 'perf_log.jsonl'
+
+_estado = threading.local()
+_lock_log = threading.Lock()
+_log_path = os.environ.get('LAS_PERF_LOG') or None
+
+# Hilos que miden memoria en este momento (tracemalloc se apaga cuando no queda ninguno)
+# y cantidad de activaciones, para saber si otro hilo midió durante una etapa
+_lock_memoria = threading.Lock()
+_midiendo = 0
+_activaciones = 0
+_tracemalloc_propio = False
+
+
+def _local():
+    if not hasattr(_estado, 'registros'):
+        _estado.registros = []
+        _estado.picos = []
+        _estado.activo = False
+        _estado.log_path = None
+    return _estado
+
+
+def configurar_log(path):
+    """Archivo JSON lines donde se agregan los registros de todos los hilos (None para no escribir)."""
+    global _log_path
+    _log_path = path
+
+
+def activar(log_path=LOG_POR_DEFECTO):
+    """Mide memoria y escribe los registros en log_path (si no hay un log global) solo en el hilo actual.
+
+    tracemalloc afecta a todo el proceso y hace más lento el código medido, por eso queda
+    encendido solo mientras algún hilo está activo; hay que llamar a desactivar() al terminar.
+    """
+    global _midiendo, _activaciones, _tracemalloc_propio
+    estado = _local()
+    if estado.activo:
+        return
+    estado.activo = True
+    estado.log_path = log_path
+    with _lock_memoria:
+        _midiendo += 1
+        _activaciones += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_propio = True
+
+
+def desactivar():
+    """Deja de medir memoria en el hilo actual y apaga tracemalloc si ningún otro hilo lo usa."""
+    global _midiendo, _tracemalloc_propio
+    estado = _local()
+    if not estado.activo:
+        return
+    estado.activo = False
+    estado.log_path = None
+    with _lock_memoria:
+        _midiendo -= 1
+        # Si tracemalloc ya estaba encendido al activar (p. ej. python -X tracemalloc) se deja como estaba
+        if _midiendo == 0 and _tracemalloc_propio:
+            tracemalloc.stop()
+            _tracemalloc_propio = False
+
+
+def reiniciar():
+    """Descarta los registros del hilo actual; se llama al comienzo de cada rerun."""
+    estado = _local()
+    estado.registros = []
+    estado.picos = []
+
+
+@contextmanager
+def sesion(activa, log_path=LOG_POR_DEFECTO):
+    """Un rerun: reinicia los registros y, si activa, mide memoria y escribe el log hasta salir."""
+    reiniciar()
+    if activa:
+        activar(log_path)
+    try:
+        yield
+    finally:
+        desactivar()
+
+
+def registros():
+    """Registros del hilo actual, en el orden en que terminaron las etapas."""
+    return list(_local().registros)
+
+
+def _escribir_log(registro):
+    path = _log_path or _local().log_path
+    if path is None:
+        return
+    with _lock_log:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+@contextmanager
+def medir(etapa, **datos):
+    """Mide la etapa y guarda un registro al salir, aunque el bloque lance una excepción.
+
+    El pico de memoria es el de todo el proceso durante la etapa: si otro hilo midió al
+    mismo tiempo (memoria_compartida) puede incluir memoria de ese hilo.
+    """
+    estado = _local()
+    memoria = estado.activo and tracemalloc.is_tracing()
+    if memoria:
+        compartida = _midiendo > 1
+        activaciones = _activaciones
+        # tracemalloc tiene un solo pico global: se guarda el de la etapa que nos contiene
+        # antes de reiniciarlo y se le devuelve el nuestro al terminar.
+        actual, pico = tracemalloc.get_traced_memory()
+        if estado.picos:
+            estado.picos[-1] = max(estado.picos[-1], pico)
+        tracemalloc.reset_peak()
+        estado.picos.append(actual)
+        base = actual
+
+    inicio = datetime.now().isoformat(timespec='milliseconds')
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        registro = {
+            'etapa': etapa,
+            'inicio': inicio,
+            'segundos': time.perf_counter() - wall,
+            'cpu_segundos': time.thread_time() - cpu,
+            'memoria_pico_mb': None,
+            'memoria_compartida': None,
+            **datos,
+        }
+        if memoria:
+            pico = estado.picos.pop()
+            if tracemalloc.is_tracing():
+                pico = max(pico, tracemalloc.get_traced_memory()[1])
+            registro['memoria_pico_mb'] = (pico - base) / 1e6
+            registro['memoria_compartida'] = compartida or _midiendo > 1 or _activaciones != activaciones
+            if estado.picos:
+                estado.picos[-1] = max(estado.picos[-1], pico)
+        estado.registros.append(registro)
+        _escribir_log(registro)
+
+
+def instrumentado(etapa=None):
+    """Decorador equivalente a envolver la función en medir(etapa)."""
+    def decorador(funcion):
+        nombre = etapa or f'{funcion.__module__}.{funcion.__name__}'
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
@@ -0,0 +1,319 @@
+# las_io.py
+# Lectura de archivos .LAS, sin dependencias de Streamlit
+
+import lasio
+from io import BytesIO, StringIO
+import hashlib
+import mmap
+import os
+import re
+import numpy as np
+import pandas as pd
+from well_store import tamano_pozo
+
+# Codificación por defecto de los .LAS generados por las cias de Wireline
+ENCODING_LAS = 'Windows-1252'
+
+# Valor nulo estándar de los .LAS; lasio solo reemplaza el NULL declarado en el encabezado
+NULO_LAS = -999.25
+
+# Línea que abre la sección de datos (~A, ~ASCII)
+SECCION_DATOS = re.compile(rb'^~A', re.MULTILINE | re.IGNORECASE)
+
+# Filas por bloque del lector por bloques (LectorLAS)
+FILAS_POR_BLOQUE = 100000
+
+# Motores de lectura: 'lasio' lee todo el archivo con lasio; 'rapido' lee el encabezado con
+# lasio y la sección ~A con leer_rapido, y vuelve a lasio si el archivo no se puede leer así
+MOTORES = ('lasio', 'rapido')
+
+# Identify and rename specific variables
+MAPEO_CURVAS = {
+    'CBLF': 'CBL',
+    'AMP3FT': 'CBL',
+    'AMP': 'CBL',
+    'CBL': 'CBL'
+}
+
+def clave_contenido(bytes_data, encoding=ENCODING_LAS):
+    """Clave de caché: hash del contenido del archivo más la codificación usada para leerlo."""
+    return f"{hashlib.sha256(bytes_data).hexdigest()}-{encoding.lower()}"
+
+def compactar(las_file, well_data):
+    """Curvas en float32 (DEPTH sigue en float64) y sin la copia de los datos dentro del LASFile.
+
+    Las páginas solo usan los metadatos de las curvas del LASFile (nombre, unidad y
+    descripción), así que sus arrays se liberan. DEPTH pasa del índice a columna sin
+    duplicarse: el índice queda como RangeIndex.
+    """
+    depth = well_data.index.to_numpy(dtype=np.float64)
+    well_data.index = pd.RangeIndex(len(well_data))
+    well_data = well_data.astype({col: np.float32 for col in well_data.columns if well_data[col].dtype.kind == 'f'})
+    well_data['DEPTH'] = depth
+    for curve in las_file.curves:
+        curve.data = np.empty(0)
+    return well_data
+
+def _primera_linea(n, condicion):
+    """Primer índice en [0, n) donde condicion(i) es verdadera (condicion monótona), o n."""
+    lo, hi = 0, n
+    while lo < hi:
+        medio = (lo + hi) // 2
+        if condicion(medio):
+            hi = medio
+        else:
+            lo = medio + 1
+    return lo
+
+def _fin_encabezado(bytes_data):
+    """Posición donde empiezan los datos (después de la línea ~A), o None si no hay sección ~A."""
+    encontrado = SECCION_DATOS.search(bytes_data)
+    if encontrado is None:
+        return None
+    inicio_datos = bytes_data.find(b'\n', encontrado.start()) + 1
+    return inicio_datos or None
+
+def texto_encabezado(bytes_data, encoding=ENCODING_LAS):
+    """Texto del .LAS hasta la línea ~A inclusive; lasio.read(..., ignore_data=True) lo reconstruye."""
+    inicio_datos = _fin_encabezado(bytes_data)
+    return None if inicio_datos is None else bytes_data[:inicio_datos].decode(encoding)
+
+def _encabezado(bytes_data, encoding):
+    """LASFile sin datos y posición donde empieza ~A; None si no hay ~A o los datos están envueltos
+    o separados por algo que no es el espacio."""
+    inicio_datos = _fin_encabezado(bytes_data)
+    if inicio_datos is None:
+        return None
+    las_file = lasio.read(StringIO(bytes_data[:inicio_datos].decode(encoding)), ignore_data=True)
+    if 'WRAP' in las_file.version.keys() and str(las_file.version['WRAP'].value).strip().upper().startswith('Y'):
+        return None
+    # LAS 3.0 con otro delimitador que el espacio
+    if 'DLM' in las_file.version.keys() and str(las_file.version['DLM'].value).strip().upper() not in ('', 'SPACE'):
+        return None
+    return las_file, inicio_datos
+
+def _separador_decimal(seccion):
+    """b',' si la primera línea de datos usa coma decimal (los valores se separan con espacios)."""
+    primera = next((linea for linea in seccion[:4096].split(b'\n') if linea.strip()), b'')
+    return b',' if b',' in primera and b'.' not in primera else b'.'
+
+def _parsear_datos(seccion, nombres):
+    """Matriz (filas, curvas) float64 de las líneas de datos de ~A, o None si no se pueden leer.
+
+    Se tokeniza con el motor C de pandas directamente desde los bytes, sin decodificar la
+    sección a texto: los datos numéricos son ASCII, así que se leen como UTF-8, que pandas
+    no recodifica (con Windows-1252 pasaría todo por un decodificador); un byte fuera de
+    ASCII hace que se lea con lasio. Con un espacio como separador (skipinitialspace absorbe
+    los repetidos) es bastante más rápido que con '\\s+', que queda para tabulaciones,
+    espacios al final de la línea o filas que no se pudieron leer así.
+    """
+    decimal = _separador_decimal(seccion)
+    primeras = seccion[:4096]
+    separadores = [{'sep': r'\s+'}]
+    if b'\t' not in primeras and b' \n' not in primeras and b' \r' not in primeras:
+        separadores.insert(0, {'sep': ' ', 'skipinitialspace': True})
+    for separador in separadores:
+        try:
+            datos = pd.read_csv(BytesIO(seccion), header=None, names=nombres, dtype=np.float64,
+                                decimal=decimal.decode(), encoding='utf-8', **separador)
+        except (ValueError, pd.errors.ParserError):
+            continue
+        valores = datos.to_numpy()
+        # Los nulos del .LAS son números: un NaN viene de una fila incompleta o de un valor
+        # no numérico, casos que se dejan a lasio
+        if not np.isnan(valores).any():
+            return valores
+    return None
+
+def _como_dataframe(las_file, nombres, valores):
+    """DataFrame indexado por la primera curva, como LASFile.df(), con el NULL del encabezado en NaN."""
+    null = las_file.well['NULL'].value if 'NULL' in las_file.well.keys() else None
+    if null is not None:
+        valores[valores == null] = np.nan
+    return pd.DataFrame(valores[:, 1:], columns=nombres[1:], index=pd.Index(valores[:, 0], name=nombres[0]))
+
+def leer_rapido(bytes_data, encoding=ENCODING_LAS):
+    """Lee el .LAS completo con el encabezado de lasio y la sección ~A convertida por _parsear_datos.
+
+    Devuelve None si el archivo no se puede leer así (datos envueltos, delimitador que no es
+    el espacio, texto, comentarios o filas incompletas en los datos) para que se lea con lasio.
+    """
+    leido = _encabezado(bytes_data, encoding)
+    if leido is None:
+        return None
+    las_file, inicio_datos = leido
+    nombres = [curve.mnemonic for curve in las_file.curves]
+    valores = _parsear_datos(bytes_data[inicio_datos:], nombres)
+    if valores is None:
+        return None
+    return las_file, _como_dataframe(las_file, nombres, valores)
+
+def leer_ventana(bytes_data, encoding=ENCODING_LAS, tope=None, base=None, paso=1):
+    """Lee solo las filas de datos con tope <= profundidad <= base, tomando una de cada paso.
+
+    El encabezado se parsea con lasio sin la sección de datos. En ~A se ubica la ventana con
+    búsqueda binaria sobre posiciones de byte: en cada paso se salta al comienzo de la línea
+    siguiente y solo se convierte su primer valor. Así la memoria y el tiempo dependen del
+    tamaño de la ventana y no del archivo. Solo las líneas de la ventana se parsean, con
+    _parsear_datos. Devuelve None si el archivo no se puede leer así (datos envueltos, líneas
+    vacías o columnas que no coinciden con las curvas) para que se lea completo con lasio.
+    """
+    leido = _encabezado(bytes_data, encoding)
+    if leido is None:
+        return None
+    las_file, inicio_datos = leido
+    nombres = [curve.mnemonic for curve in las_file.curves]
+    decimal = _separador_decimal(bytes_data[inicio_datos:inicio_datos + 4096])
+
+    # Fin de la última línea con datos (sin los espacios y saltos del final del archivo)
+    fin_datos = len(bytes_data)
+    while fin_datos > inicio_datos and bytes_data[fin_datos - 1:fin_datos].isspace():
+        fin_datos -= 1
+
+    def linea_desde(posicion):
+        """Comienzo de la primera línea que empieza en posicion o después (fin_datos si no hay)."""
+        if posicion <= inicio_datos:
+            return inicio_datos
+        if bytes_data[posicion - 1:posicion] == b'\n':
+            return min(posicion, fin_datos)
+        salto = bytes_data.find(b'\n', posicion, fin_datos)
+        return fin_datos if salto < 0 else salto + 1
+
+    def profundidad(comienzo):
+        fin_linea = bytes_data.find(b'\n', comienzo, fin_datos)
+        linea = bytes_data[comienzo:fin_datos if fin_linea < 0 else fin_linea]
+        return float(linea.split(None, 1)[0].replace(decimal, b'.'))
+
+    def primera(condicion):
+        """Comienzo de la primera línea que cumple condicion (monótona en el archivo), o fin_datos."""
+        def cumple(posicion):
+            comienzo = linea_desde(posicion)
+            return comienzo >= fin_datos or condicion(profundidad(comienzo))
+        return linea_desde(inicio_datos + _primera_linea(fin_datos - inicio_datos, lambda i: cumple(inicio_datos + i)))
+
+    try:
+        if fin_datos == inicio_datos:
+            inicio = fin = inicio_datos
+        elif profundidad(bytes_data.rfind(b'\n', inicio_datos, fin_datos) + 1 or inicio_datos) >= profundidad(inicio_datos):
+            inicio = inicio_datos if tope is None else primera(lambda d: d >= tope)
+            fin = fin_datos if base is None else primera(lambda d: d > base)
+        else:
+            inicio = inicio_datos if base is None else primera(lambda d: d <= base)
+            fin = fin_datos if tope is None else primera(lambda d: d < tope)
+    except (ValueError, IndexError):
+        return None
+
+    if inicio >= fin:
+        valores = np.empty((0, len(nombres)))
+    else:
+        seccion = bytes_data[inicio:fin]
+        if paso > 1:
+            lineas = seccion.split(b'\n')
+            seccion = b'\n'.join(lineas[::paso] if lineas[-1] else lineas[:-1][::paso])
+        valores = _parsear_datos(seccion, nombres)
+        if valores is None:
+            return None
+    return las_file, _como_dataframe(las_file, nombres, valores)
+
+def recortar_ventana(well_data, tope=None, base=None, paso=1):
+    """Misma ventana que leer_ventana sobre un DataFrame ya leído completo (índice = profundidad)."""
+    depth = well_data.index.to_numpy(dtype=float)
+    en_ventana = np.ones(len(depth), dtype=bool)
+    if tope is not None:
+        en_ventana &= depth >= tope
+    if base is not None:
+        en_ventana &= depth <= base
+    return well_data[en_ventana].iloc[::paso]
+
+def parsear_las(bytes_data, encoding=ENCODING_LAS, compacto=False, tope=None, base=None, paso=1, motor='lasio'):
+    """Lee el .LAS desde bytes y devuelve el LASFile y el DataFrame con las curvas renombradas.
+
+    Los -999.25 se convierten a NaN aunque el encabezado declare otro NULL. Con compacto=True
+    el pozo se guarda con compactar(). Con tope, base o paso solo se leen las filas de esa
+    ventana (ver leer_ventana); con motor='rapido' los datos se leen con leer_rapido. En los
+    dos casos el encabezado y las curvas del LASFile siguen completos, pero sin datos. En
+    well_data.attrs['memoria_carga'] quedan los bytes del pozo antes ('antes': float64 con
+    DEPTH duplicado) y después de la carga ('despues').
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de lectura desconocido: {motor}")
+    parcial = tope is not None or base is not None or paso > 1
+    if parcial:
+        leido = leer_ventana(bytes_data, encoding, tope, base, paso)
+    else:
+        leido = leer_rapido(bytes_data, encoding) if motor == 'rapido' else None
+    if leido is not None:
+        las_file, well_data = leido
+    else:
+        str_io = StringIO(bytes_data.decode(encoding))
+        las_file = lasio.read(str_io)
+        well_data = las_file.df()
+        if parcial:
+            well_data = recortar_ventana(well_data, tope, base, paso)
+    for columna in well_data.columns:
+        values = well_data[columna].to_numpy()
+        if values.dtype.kind == 'f' and (values == NULO_LAS).any():
+            well_data[columna] = np.where(values == NULO_LAS, np.nan, values)
+    # El índice cuenta dos veces: la carga sin compactar lo copia como columna DEPTH
+    memoria_antes = tamano_pozo(las_file, well_data) + well_data.index.nbytes
+    if compacto:
+        well_data = compactar(las_file, well_data)
+    else:
+        well_data['DEPTH'] = well_data.index
+
+    well_data.rename(columns=MAPEO_CURVAS, inplace=True)
+    well_data.attrs['memoria_carga'] = {'antes': memoria_antes, 'despues': tamano_pozo(las_file, well_data)}
+    return las_file, well_data
+
+class LectorLAS:
+    """Lee un .LAS por bloques de filas sin cargar la sección de datos completa en memoria.
+
+    fuente es la ruta del archivo (se abre con mmap) o sus bytes. El encabezado se parsea al
+    abrir, con lasio y sin datos. bloques() recorre ~A de a filas_por_bloque filas y se puede
+    llamar más de una vez. Los .LAS envueltos (WRAP YES) no se pueden leer así: ValueError.
+    """
+
+    def __init__(self, fuente, encoding=ENCODING_LAS, filas_por_bloque=FILAS_POR_BLOQUE):
+        self.fuente = fuente
+        self.encoding = encoding
+        self.filas_por_bloque = filas_por_bloque
+
+        with self._abrir() as archivo:
+            lineas = []
+            for linea in iter(archivo.readline, b''):
+                lineas.append(linea)
+                if linea.lstrip()[:2].upper() == b'~A':
+                    break
+            else:
+                raise ValueError('El archivo no tiene sección ~A')
+            self.inicio_datos = archivo.tell()
+            self.decimal = _separador_decimal(archivo.read(4096)).decode()
+
+        self.las_file = lasio.read(StringIO(b''.join(lineas).decode(encoding)), ignore_data=True)
+        if 'WRAP' in self.las_file.version.keys() and str(self.las_file.version['WRAP'].value).strip().upper().startswith('Y'):
+            raise ValueError('Los .LAS envueltos (WRAP YES) no se pueden leer por bloques')
+        self.curvas = [curve.mnemonic for curve in self.las_file.curves]
+        # Misma convención que parsear_las: la primera curva es la profundidad y se llama DEPTH
+        self.columnas = ['DEPTH'] + [MAPEO_CURVAS.get(nombre, nombre) for nombre in self.curvas[1:]]
+        self.null = self.las_file.well['NULL'].value if 'NULL' in self.las_file.well.keys() else None
+
+    def _abrir(self):
+        if isinstance(self.fuente, (str, os.PathLike)):
+            with open(self.fuente, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return BytesIO(self.fuente)
+
+    def bloques(self):
+        """Genera arrays (filas, curvas) de float64, con la profundidad en la columna 0 y NaN en los nulos."""
+        with self._abrir() as archivo:
+            archivo.seek(self.inicio_datos)
+            lector = pd.read_csv(archivo, sep=r'\s+', header=None, names=self.curvas, dtype=np.float64,
+                                 decimal=self.decimal, encoding='utf-8', chunksize=self.filas_por_bloque)
+            with lector:
+                for bloque in lector:
+                    valores = bloque.to_numpy()
+                    nulos = valores == NULO_LAS
+                    if self.null is not None:
+                        nulos |= valores == self.null
+                    valores[nulos] = np.nan
+                    yield valores
@@ -2,14 +2,53 @@ import streamlit as st
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
+from io import BytesIO
+from matplotlib.figure import Figure
+from estadisticas import BINS_HISTOGRAMA, MAX_MUESTRAS_CORRELACION, EstadisticasCurvas, correlacion_curvas, pares_mas_correlacionados
+from instrumentation import instrumentado, medir
+import well_store
+from cobertura import indice_cobertura
 
+# Los histogramas se muestran de a una página de curvas por vez, en una sola figura
+CURVAS_POR_PAGINA = 12
+COLUMNAS_GRILLA = 4
+
+def grilla_histogramas(estadisticas, columnas):
+    """Histograma con KDE de cada curva en una grilla de una sola figura, renderizada a PNG."""
+    n_columnas = min(COLUMNAS_GRILLA, len(columnas))
+    n_filas = -(-len(columnas) // n_columnas)
+    fig = Figure(figsize=(4 * n_columnas, 3 * n_filas))
+    axes = fig.subplots(n_filas, n_columnas, squeeze=False).ravel()
+    for ax, columna in zip(axes, columnas):
+        histograma = estadisticas.histogramas[columna]
+        ax.set_title(f'Histograma de {columna}', fontsize=9)
+        ax.tick_params(labelsize=7)
+        if histograma.n == 0:
+            ax.text(0.5, 0.5, 'Sin datos', ha='center', va='center', transform=ax.transAxes)
+            continue
+        ax.stairs(histograma.conteos, histograma.bordes, fill=True, alpha=0.5)
+        ax.plot(histograma.grilla, histograma.kde)
+    for ax in axes[len(columnas):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=100)
+    return buffer.getvalue()
+
+@instrumentado('las_q.quality')
 def quality(las_file, well_data):
     st.title('Control de Calidad de .LAS')
 
     if las_file is not None and well_data is not None:
         # Display summary statistics of well data
         st.write('### Estadísticas del archivo LAS')
-        st.write(well_data.describe())
+        # Estadísticas, histogramas y KDE de todas las curvas en una pasada por curva, cacheados por pozo
+        clave = well_store.clave_pozo(well_data)
+        columnas_pozo = tuple(well_data.columns)
+        with medir('las_q.estadisticas'):
+            estadisticas = well_store.store.derivado(clave, 'las_q.estadisticas', (columnas_pozo, BINS_HISTOGRAMA),
+                                                     lambda: EstadisticasCurvas(well_data))
+            st.write(estadisticas.descripcion)
 
         # Display the dataframe
         st.write('### Datos del archivo LAS')
@@ -17,20 +56,38 @@ def quality(las_file, well_data):
 
         # Correlation matrix
         st.write('### Matriz de Correlación')
-        corr_matrix = well_data.corr()
-        fig, ax = plt.subplots(figsize=(20, 16))  # Aumenta el tamaño de la figura
-        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', ax=ax, annot_kws={"size": 6}, fmt=".2f", linewidths=0.5)
-        plt.xticks(rotation=90, ha='center', fontsize=8)
-        plt.yticks(fontsize=8)
-        st.pyplot(fig)
+        metodo = st.selectbox('Método de correlación', ['pearson', 'spearman'])
+        depth_min, depth_max = float(well_data['DEPTH'].min()), float(well_data['DEPTH'].max())
+        tope, base = st.slider('Intervalo de profundidad para la correlación', depth_min, depth_max, (depth_min, depth_max))
+        max_muestras = None if st.checkbox(f'Usar todas las muestras (por defecto hasta {MAX_MUESTRAS_CORRELACION})') else MAX_MUESTRAS_CORRELACION
+        k_pares = st.number_input('Pares más correlacionados a mostrar', 1, 100, 10)
+        with medir('las_q.correlacion'):
+            corr_matrix = well_store.store.derivado(clave, 'las_q.correlacion', (columnas_pozo, metodo, tope, base, max_muestras),
+                                                    lambda: correlacion_curvas(well_data, metodo, tope, base, max_muestras))
+            pares = pares_mas_correlacionados(corr_matrix, k_pares)
+        st.table(pares)
+
+        # La matriz completa de 60 curvas es ilegible: solo se dibujan las curvas elegidas
+        curvas_destacadas = list(dict.fromkeys(pares[['Curva 1', 'Curva 2']].head(5).to_numpy().ravel()))
+        curvas_matriz = st.multiselect('Curvas para la matriz de correlación', list(corr_matrix.columns), default=curvas_destacadas)
+        if len(curvas_matriz) > 1:
+            lado = max(4, 0.6 * len(curvas_matriz))
+            fig, ax = plt.subplots(figsize=(lado * 1.25, lado))
+            sns.heatmap(corr_matrix.loc[curvas_matriz, curvas_matriz], annot=len(curvas_matriz) <= 20, cmap='coolwarm', vmin=-1, vmax=1,
+                        ax=ax, annot_kws={"size": 6}, fmt=".2f", linewidths=0.5)
+            plt.xticks(rotation=90, ha='center', fontsize=8)
+            plt.yticks(fontsize=8)
+            st.pyplot(fig)
 
         # Histograms of the well data
         st.write('### Histogramas de datos LAS')
-        for column in well_data.columns:
-            fig, ax = plt.subplots()
-            sns.histplot(well_data[column], bins=30, kde=True, ax=ax)
-            ax.set_title(f'Histograma de {column}')
-            st.pyplot(fig)
+        n_paginas = -(-len(estadisticas.columnas) // CURVAS_POR_PAGINA)
+        pagina = st.number_input('Página de histogramas', 1, n_paginas, 1) if n_paginas > 1 else 1
+        seleccion = tuple(estadisticas.columnas[(pagina - 1) * CURVAS_POR_PAGINA:pagina * CURVAS_POR_PAGINA])
+        if seleccion:
+            with medir('las_q.histogramas', curvas=len(seleccion)):
+                st.image(well_store.store.derivado(clave, 'las_q.histogramas', (columnas_pozo, BINS_HISTOGRAMA, seleccion),
+                                                   lambda: grilla_histogramas(estadisticas, seleccion)))
         
         # Scatter plots to visualize relationships
         st.write('### Gráficos de Dispersión')
@@ -46,21 +103,19 @@ def quality(las_file, well_data):
         # Checkbox to show or hide missing data
         if st.checkbox('Mostrar datos faltantes'):
             st.write('### Datos Faltantes')
-            missing_data = well_data.isnull().sum()
+            missing_data = indice_cobertura(well_data).faltantes()
             st.write(missing_data[missing_data > 0])
             
         # Basic CBL analysis assuming CBL is in the data
         if 'CBL' in well_data.columns:
             st.write('### Análisis básico de CBL')
             cbl_data = well_data['CBL']
-            fig, ax = plt.subplots()
-            sns.histplot(cbl_data, bins=30, kde=True, ax=ax)
-            ax.set_title('Histograma de CBL')
-            st.pyplot(fig)
+            st.image(well_store.store.derivado(clave, 'las_q.histogramas', (columnas_pozo, BINS_HISTOGRAMA, ('CBL',)),
+                                               lambda: grilla_histogramas(estadisticas, ('CBL',))))
             
             # Descriptive statistics for CBL
             st.write('Estadísticas descriptivas de CBL')
-            st.write(cbl_data.describe())
+            st.write(estadisticas.descripcion['CBL'])
             
             # Scatter plot of CBL vs Depth
             if 'DEPTH' in well_data.columns:
@@ -9,6 +9,8 @@ import plotly.graph_objects as go
 import plotly.figure_factory as ff
 import plotly.express as px
 
+from cobertura import indice_cobertura
+
 
 def missing(las_file, well_data):
     st.title('Datos ausentes en el .LAS')
@@ -21,7 +23,8 @@ def missing(las_file, well_data):
          To zoom in, click and drag on one of the tracks with the left mouse button. 
          To zoom back out double click on the plot.""")
 
-        data_nan = well_data.notnull().astype('int')
+        # Tramos con dato de cada curva; se dibuja un rectángulo por tramo en vez de cada muestra
+        cobertura = indice_cobertura(well_data)
         # Need to setup an empty list for len check to work
         curves = []
         columns = list(well_data.columns)
@@ -46,8 +49,9 @@ def missing(las_file, well_data):
             fig = make_subplots(rows=1, cols= len(curves), subplot_titles=curves, shared_yaxes=True, horizontal_spacing=0.02)
 
             for curve in curves:
-                fig.add_trace(go.Scatter(x=data_nan[curve], y=well_data['DEPTH'], 
-                    fill='tozerox',line=dict(width=0), fillcolor=fill_color_md), row=1, col=curve_index)
+                x, y = cobertura.poligonos(curve)
+                fig.add_trace(go.Scatter(x=x, y=y, mode='lines',
+                    fill='toself',line=dict(width=0), fillcolor=fill_color_md), row=1, col=curve_index)
                 fig.update_xaxes(range=[0, 1], visible=False)
                 fig.update_xaxes(range=[0, 1], visible=False)
                 curve_index+=1
@@ -7,6 +7,12 @@ import plotly.graph_objects as go
 import plotly.figure_factory as ff
 import plotly.express as px
 
+from decimation import diezmar, submuestrear
+from welllog import well_log
+
+# Puntos máximos enviados al navegador en el crossplot
+MAX_PUNTOS_CROSSPLOT = 20000
+
 
 def plot(las_file, well_data):
     st.title('Visualizador de .LAS')
@@ -17,6 +23,12 @@ def plot(las_file, well_data):
     else:
         columns = list(well_data.columns)
         st.write('Expandir para visualizar la data del pozo.')
+
+        # Los tracks se diezman a la altura de la figura; al acotar el intervalo se
+        # vuelve a diezmar solo esa ventana y se recupera el detalle.
+        depth_min, depth_max = float(well_data['DEPTH'].min()), float(well_data['DEPTH'].max())
+        top_depth, bottom_depth = st.slider('Intervalo de profundidad', depth_min, depth_max, (depth_min, depth_max))
+        ventana = well_data.iloc[well_log(well_data).ventana(top_depth, bottom_depth)]
         
         with st.expander('Seleccionar curvas'):    
             curves = st.multiselect('Selecciona curvas para visualizar', columns)
@@ -27,7 +39,8 @@ def plot(las_file, well_data):
                 fig = make_subplots(rows=1, cols= len(curves), subplot_titles=curves, shared_yaxes=True)
 
                 for curve in curves:
-                    fig.add_trace(go.Scatter(x=well_data[curve], y=well_data['DEPTH']), row=1, col=curve_index)
+                    track = diezmar(ventana, [curve])
+                    fig.add_trace(go.Scatter(x=track[curve], y=track['DEPTH']), row=1, col=curve_index)
                     curve_index+=1
                 
                 fig.update_layout(height=1000, showlegend=False, yaxis={'title':'DEPTH','autorange':'reversed'})
@@ -76,6 +89,8 @@ def plot(las_file, well_data):
 
             col2.write('Crossplot')
            
-            xplot = px.scatter(well_data, x=xplot_x, y=xplot_y, color=xplot_col, log_x=xplot_x_bool, log_y=xplot_y_bool)
+            # Submuestra al azar: el diezmado por extremos de los tracks sesgaría la nube hacia los valores extremos
+            xplot_data = submuestrear(ventana, list(dict.fromkeys([xplot_x, xplot_y])), MAX_PUNTOS_CROSSPLOT)
+            xplot = px.scatter(xplot_data, x=xplot_x, y=xplot_y, color=xplot_col, log_x=xplot_x_bool, log_y=xplot_y_bool)
             xplot.layout.template='seaborn'
             col2.plotly_chart(xplot, use_container_width=True)
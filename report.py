@@ -0,0 +1,242 @@
+# report.py
+# Generación del reporte PDF de calidad de cemento
+
+import streamlit as st
+import seaborn as sns
+from matplotlib.figure import Figure
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from fpdf import FPDF
+from datetime import datetime
+from cemento import porcentajes_calidad, suavizar_cbl
+from instrumentation import instrumentado
+
+# Resolución y formato de las figuras embebidas en el reporte
+DPI_REPORTE = 300
+FORMATO_IMAGEN = 'png'
+
+# Clase PDF para generar el reporte
+class PDF(FPDF):
+    def __init__(self, logo_path, well_name):
+        super().__init__()
+        self.logo_path = logo_path
+        self.well_name = well_name
+
+    def header(self):
+        self.set_font('Arial', 'B', 10)
+        self.cell(0, 8, f'Reporte de Análisis de Calidad de Cemento - {self.well_name}', 0, 1, 'C')
+        self.image(self.logo_path, 10, 8, 25)
+        self.ln(15)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+
+    def chapter_title(self, title):
+        self.set_font('Arial', 'B', 14)
+        self.cell(0, 10, title, 0, 1, 'L')
+        self.ln(5)
+
+    def chapter_subtitle(self, subtitle):
+        self.set_font('Arial', 'B', 10)
+        self.cell(0, 10, subtitle, 0, 1, 'L')
+        self.ln(5)
+
+    def chapter_body(self, body):
+        self.set_font('Arial', '', 9)
+        self.multi_cell(0, 8, body)
+        self.ln()
+
+    def add_image(self, image_path, x, y, width, height=None):
+        self.image(image_path, x=x, y=y, w=width, h=height)
+
+    def add_table(self, data, x_start, col_widths, row_height, max_rows=None):
+        self.set_xy(x_start, self.get_y())
+        self.set_font('Arial', '', 8)
+        row_count = 0
+        for row in data:
+            if max_rows and row_count >= max_rows:
+                break
+            for item, col_width in zip(row, col_widths):
+                self.cell(col_width, row_height, str(item), border=1, align='C')
+            self.ln(row_height)
+            self.set_x(x_start)
+            row_count += 1
+        if max_rows and row_count < len(data):
+            self.add_page()
+            self.add_table(data[row_count:], x_start, col_widths, row_height, max_rows)
+
+    def add_cover(self):
+        self.add_page()
+        self.set_font('Arial', 'B', 20)
+        self.cell(0, 40, 'Reporte de Análisis de Cemento en Pozos', 0, 1, 'C')
+        self.set_font('Arial', 'B', 14)
+        self.cell(0, 10, f'Pozo: {self.well_name}', 0, 1, 'C')
+        self.cell(0, 10, f'Fecha: {datetime.now().strftime("%d/%m/%Y")}', 0, 1, 'C')
+        self.ln(20)
+
+def guardar_figura(fig, dpi, formato):
+    """Renderiza la figura en un buffer en memoria."""
+    buffer = BytesIO()
+    fig.savefig(buffer, format=formato, dpi=dpi, bbox_inches='tight')
+    buffer.seek(0)
+    return buffer
+
+def figura_calidad_cemento(well_data, toc_teorico, toc_calculado_rango, dpi=DPI_REPORTE, formato=FORMATO_IMAGEN):
+    """Gráfico de relación entre calidad de cemento, CBL y profundidad."""
+    # Se usa Figure directamente (sin pyplot) para poder renderizar varias figuras en paralelo
+    fig = Figure(figsize=(4, 6))
+    ax = fig.subplots()
+    sns.scatterplot(data=well_data, x='CBL', y='DEPTH', hue='calidad_cemento', palette='viridis', s=10, ax=ax)
+    ax.invert_yaxis()
+    ax.axhline(y=toc_calculado_rango, color='blue', linestyle='--', label='TOC Calculado en el Rango')
+    ax.axhline(y=toc_teorico, color='red', linestyle='--', label='TOC Teórico')
+    ax.axhline(y=well_data['DEPTH'].min(), color='green', linestyle='--', label='Inicio del Rango Analizado')
+    ax.axhline(y=well_data['DEPTH'].max(), color='orange', linestyle='--', label='Fin del Rango Analizado')
+    ax.legend(fontsize='x-small')
+    return guardar_figura(fig, dpi, formato)
+
+def figura_punzados(well_data, tabla_predominantes, ampliacion_rango, dpi=DPI_REPORTE, formato=FORMATO_IMAGEN):
+    """Gráfico de análisis de cemento vs punzados con los mismos parámetros que en la aplicación."""
+    fig = Figure(figsize=(6, 8))
+    ax = fig.subplots()
+    cbl_smooth = suavizar_cbl(well_data['CBL'], window_length=5, polyorder=3)
+
+    color = 'tab:red'
+    ax.set_xlabel('Amplitud de CBL')
+    ax.set_ylabel('Profundidad (DEPTH)')
+    ax.plot(cbl_smooth, well_data['DEPTH'], color=color, label='CBL (Suavizado)', linewidth=0.5)
+    ax.tick_params(axis='x', labelrotation=90)
+    ax.invert_yaxis()
+
+    # Ajustar la escala del eje y para que abarque todo el rango de profundidades
+    max_depth = tabla_predominantes['BASE'].max() + ampliacion_rango
+    min_depth = tabla_predominantes['TOPE'].min() - ampliacion_rango
+    ax.set_xlim(0, 100)
+    ax.set_ylim(max_depth, min_depth)
+
+    # Añadir las zonas de análisis con colores
+    for index, row in tabla_predominantes.iterrows():
+        tope_rango = row['TOPE'] - ampliacion_rango
+        base_rango = row['BASE'] + ampliacion_rango
+
+        resultado_predominante = row['Resultado Predominante']
+        color = 'green' if resultado_predominante == 'Bueno' else 'yellow' if resultado_predominante == 'Regular' else 'red'
+
+        ax.axhspan(tope_rango, base_rango, alpha=0.3, color=color, label=f'Rango - {resultado_predominante}')
+
+    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+    return guardar_figura(fig, dpi, formato)
+
+def nombre_reporte(well_name):
+    """Nombre del archivo del reporte con el formato '<pozo>_<fecha> - Reporte de calidad de cemento.pdf'."""
+    date_str = datetime.now().strftime("%Y-%m-%d")
+    return f'{well_name}_{date_str} - Reporte de calidad de cemento.pdf'
+
+@instrumentado('generate_report')
+def generate_report(well_data, toc_teorico, toc_calculado_rango, resultados_predominantes, tabla_predominantes, params, logo_path, well_name,
+                    dpi=DPI_REPORTE, formato_imagen=FORMATO_IMAGEN):
+    """Genera el reporte PDF en memoria y devuelve sus bytes (no escribe archivos temporales)."""
+    # Las dos figuras se renderizan en paralelo mientras se arma el PDF
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        imagen_calidad = executor.submit(figura_calidad_cemento, well_data, toc_teorico, toc_calculado_rango, dpi, formato_imagen)
+        imagen_punzados = None
+        if not tabla_predominantes.empty:
+            imagen_punzados = executor.submit(figura_punzados, well_data, tabla_predominantes,
+                                              params['Ampliación de Rango'], dpi, formato_imagen)
+
+        pdf = PDF(logo_path, well_name)
+
+        # Agregar portada
+        pdf.add_cover()
+
+        # Segunda página: Parámetros e Informe de Calidad de Cemento
+        pdf.add_page()
+        pdf.chapter_title('Introducción')
+        pdf.chapter_subtitle('Parámetros del Usuario')
+        params_text = f"""Amplitud de Cañería Libre Específica: {params['Amplitud Cañería Libre Específica']}
+TOC Teórico: {params['TOC Teórico']}
+Ampliación de Rango: {params['Ampliación de Rango']}
+Método de TOC: {params.get('Método de TOC', 'Promedio de muestras Malo')}"""
+        # Con el método de transición el TOC calculado viene con su banda de confianza
+        if params.get('Banda de Confianza del TOC'):
+            params_text += f"\nBanda de Confianza del TOC: {params['Banda de Confianza del TOC']}"
+        pdf.chapter_body(params_text)
+
+        pdf.chapter_title('Análisis de Calidad de Cemento')
+
+        # Añadir gráfico a la izquierda
+        pdf.add_image(imagen_calidad.result(), x=10, y=pdf.get_y(), width=60, height=90)
+
+        # Añadir tabla de resultados a la derecha
+        pdf.set_xy(110, pdf.get_y())
+        pdf.chapter_subtitle('Resultados de Calidad de Cemento en el Rango Especificado')
+        rango_analizado = well_data[(well_data['DEPTH'] >= toc_teorico) & (well_data['DEPTH'] <= well_data['DEPTH'].max())]
+        calidad_cemento_rango = porcentajes_calidad(rango_analizado['calidad_cemento'])
+        calidad_cemento_tabla = [["Calidad de Cemento", "Porcentaje"]] + \
+                                [[index, f"{value:.2f}%"] for index, value in calidad_cemento_rango.items()]
+        pdf.add_table(calidad_cemento_tabla, x_start=110, col_widths=[45, 45], row_height=8)
+
+        # Ajustar la posición para la conclusión
+        pdf.ln(20)
+        pdf.set_xy(10, pdf.get_y() + 30)
+
+        pdf.chapter_subtitle('Conclusión del Análisis de Calidad de Cemento')
+        conclusion_cemento = generate_conclusion(calidad_cemento_rango.idxmax(), calidad_cemento_rango.max(), toc_calculado_rango)
+        pdf.chapter_body(conclusion_cemento)
+
+        # Tercera página: Análisis de Cemento vs Punzados
+        pdf.add_page()
+        pdf.chapter_title('Análisis de Cemento vs Punzados')
+
+        if imagen_punzados is None:
+            pdf.chapter_body('No se cargaron punzados para analizar.')
+        else:
+            # Añadir gráfico a la izquierda
+            pdf.add_image(imagen_punzados.result(), x=10, y=pdf.get_y(), width=60, height=90)
+
+            # Añadir tabla a la derecha
+            pdf.set_xy(110, pdf.get_y())
+            pdf.chapter_subtitle('Nuevo DataFrame a partir de la tabla copiada')
+            pdf.add_table(tabla_predominantes.values.tolist(), x_start=110, col_widths=[20, 20, 20], row_height=6)
+
+            pdf.ln(20)
+            pdf.set_xy(10, pdf.get_y() + 40)
+
+            if 'Resultado Predominante' in tabla_predominantes.columns:
+                pdf.chapter_subtitle('Conclusión del Análisis en el Rango Especificado')
+                conclusion_rango = generate_conclusion(tabla_predominantes['Resultado Predominante'].mode()[0], None, None)
+                pdf.chapter_body(conclusion_rango)
+            else:
+                st.error("La columna 'Resultado Predominante' no está presente en la tabla de datos.")
+                pdf.chapter_body("No se pudo generar la conclusión debido a la falta de datos en la columna 'Resultado Predominante'.")
+
+    return bytes(pdf.output())
+
+def generate_conclusion(calidad_predominante, porcentaje, toc_calculado_rango):
+    if calidad_predominante == 'Bueno':
+        conclusion = (
+            f"El análisis de calidad de cemento en el rango especificado revela que la calidad predominante es "
+            f"{calidad_predominante} con un {f'{porcentaje:.2f}%' if porcentaje is not None else ''} del total. "
+            f"{f'El TOC calculado en el rango es {toc_calculado_rango:.2f} metros.' if toc_calculado_rango is not None else ''} "
+            "Estos resultados sugieren que la integridad del cemento en este rango es excelente, lo que implica un sellado efectivo "
+            "de la formación y una alta fiabilidad del pozo."
+        )
+    elif calidad_predominante == 'Regular':
+        conclusion = (
+            f"El análisis de calidad de cemento en el rango especificado revela que la calidad predominante es "
+            f"{calidad_predominante} con un {f'{porcentaje:.2f}%' if porcentaje is not None else ''} del total. "
+            f"{f'El TOC calculado en el rango es {toc_calculado_rango:.2f} metros.' if toc_calculado_rango is not None else ''} "
+            "Estos resultados indican que la integridad del cemento en este rango es aceptable, pero podría requerir monitoreo adicional "
+            "para asegurar la integridad a largo plazo del pozo."
+        )
+    elif calidad_predominante == 'Malo':
+        conclusion = (
+            f"El análisis de calidad de cemento en el rango especificado revela que la calidad predominante es "
+            f"{calidad_predominante} con un {f'{porcentaje:.2f}%' if porcentaje is not None else ''} del total. "
+            f"{f'El TOC calculado en el rango es {toc_calculado_rango:.2f} metros.' if toc_calculado_rango is not None else ''} "
+            "Estos resultados sugieren que la integridad del cemento en este rango es deficiente, lo que podría implicar problemas "
+            "potenciales de sellado y la necesidad de medidas correctivas para asegurar la integridad del pozo."
+        )
+    return conclusion
@@ -0,0 +1,57 @@
+# La clasificación vectorizada tiene que coincidir muestra a muestra con las reglas por fila de cbl.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cbl import verificar_calidad_cemento
+from cemento import CALIDADES, codigos_calidad_cemento
+
+
+def calidades_por_fila(cbl_values, amplitud):
+    filas = pd.DataFrame({'CBL': cbl_values})
+    return [verificar_calidad_cemento(fila, amplitud) for _, fila in filas.iterrows()]
+
+
+def calidades_vectorizadas(cbl_values, amplitud):
+    return [CALIDADES[codigo] for codigo in codigos_calidad_cemento(cbl_values, amplitud)]
+
+
+def valores_de_prueba(amplitud):
+    bordes = [0.1 * amplitud, 0.5 * amplitud]
+    vecinos = [np.nextafter(borde, direccion) for borde in bordes for direccion in (-np.inf, np.inf)]
+    return np.array([np.nan, 0.0, -0.0, -1.0, -amplitud, *bordes, *vecinos,
+                     0.3 * amplitud, amplitud, 2 * amplitud, np.inf, -np.inf])
+
+
+@pytest.mark.parametrize('amplitud', [72.0, 100.0, 7.3, 0.0, -10.0])
+def test_coincide_con_reglas_por_fila(amplitud):
+    valores = valores_de_prueba(amplitud)
+    assert calidades_vectorizadas(valores, amplitud) == calidades_por_fila(valores, amplitud)
+
+
+def test_curva_aleatoria():
+    rng = np.random.default_rng(0)
+    valores = rng.uniform(-5, 100, 2000)
+    valores[rng.integers(0, 2000, 100)] = np.nan
+    valores[rng.integers(0, 2000, 50)] = 0.0
+    assert calidades_vectorizadas(valores, 72.0) == calidades_por_fila(valores, 72.0)
+
+
+def test_varias_amplitudes():
+    amplitudes = np.array([50.0, 72.0, 100.0])
+    valores = np.concatenate([valores_de_prueba(a) for a in amplitudes])
+    codigos = codigos_calidad_cemento(valores, amplitudes)
+    assert codigos.shape == (len(amplitudes), len(valores))
+    assert codigos.dtype == np.int8
+    for fila, amplitud in zip(codigos, amplitudes):
+        np.testing.assert_array_equal(fila, codigos_calidad_cemento(valores, amplitud))
+        assert [CALIDADES[c] for c in fila] == calidades_por_fila(valores, amplitud)
+
+
+def test_bordes_y_valores_especiales():
+    # Con A = 100 los bordes son exactos: < 10 Bueno, (10, 50] Regular, > 50 Malo, NaN Regular
+    valores = np.array([np.nan, 0.0, -3.0, 9.99, 10.0, 30.0, 50.0, 50.01])
+    esperado = ['Regular', 'Bueno', 'Bueno', 'Bueno', 'Regular', 'Regular', 'Regular', 'Malo']
+    assert calidades_vectorizadas(valores, 100.0) == esperado
+    assert calidades_por_fila(valores, 100.0) == esperado
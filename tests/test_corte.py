@@ -0,0 +1,77 @@
+# identify_cuplas tiene que dar la misma tabla que el recorrido por fila al que reemplazó
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from corte import agrupar_picos, identify_cuplas
+
+
+def cuplas_por_fila(well_data, ccl_upper_limit_auto, tolerancia=1):
+    """Versión anterior de identify_cuplas (sin la ventana de dist_promedio, que no se usaba)."""
+    well_data = well_data.reset_index(drop=True)
+    well_data['EsCupla'] = well_data['CCL'] > ccl_upper_limit_auto
+    cuplas_table = pd.DataFrame(columns=['Profundidad', 'Valido'])
+    for idx, row in well_data.iterrows():
+        if row['EsCupla']:
+            next_point = well_data.iloc[idx + 1] if idx + 1 < len(well_data) else None
+            if next_point is not None and next_point['EsCupla'] and abs(next_point['DEPTH'] - row['DEPTH']) <= tolerancia:
+                continue
+            if len(cuplas_table) > 0:
+                min_depth = row['DEPTH'] - 1
+                max_depth = row['DEPTH'] + 1
+                if ((cuplas_table['Profundidad'] >= min_depth) & (cuplas_table['Profundidad'] <= max_depth)).any():
+                    continue
+            cuplas_table.loc[len(cuplas_table)] = {'Profundidad': row['DEPTH'], 'Valido': 'Valido'}
+    cuplas_table = cuplas_table.sort_values(by='Profundidad', ascending=True).reset_index(drop=True)
+    cuplas_table['Nro de Cupla'] = ['C.' + str(i) for i in range(1, len(cuplas_table) + 1)]
+    return cuplas_table
+
+
+def traza_ccl(rng, forma):
+    """Pozo sintético con muestreo de 0.1 m y picos de CCL a separaciones de 1 m exacto y cercanas."""
+    n = int(rng.integers(50, 300))
+    depth = 1000 + np.arange(n) * 0.1
+    if forma == 'decreciente':
+        depth = depth[::-1]
+    elif forma == 'empalmada':
+        corte = n // 2
+        depth = np.concatenate([depth[:corte], depth[corte // 2:corte // 2 + n - corte]])
+    ccl = rng.normal(0, 1, n)
+    posicion = int(rng.integers(0, 10))
+    while posicion < n:
+        ccl[posicion:posicion + int(rng.integers(1, 3))] = 10
+        posicion += int(rng.choice([9, 10, 10, 10, 11, 15, 96]))
+    return pd.DataFrame({'DEPTH': depth, 'CCL': ccl})
+
+
+@pytest.mark.parametrize('forma', ['creciente', 'decreciente', 'empalmada'])
+def test_coincide_con_recorrido_por_fila(forma):
+    rng = np.random.default_rng({'creciente': 0, 'decreciente': 1, 'empalmada': 2}[forma])
+    for _ in range(100):
+        well_data = traza_ccl(rng, forma)
+        esperado = cuplas_por_fila(well_data, 5)
+        obtenido = identify_cuplas(well_data.copy(), 5)
+        np.testing.assert_array_equal(obtenido['Profundidad'].to_numpy(dtype=float), esperado['Profundidad'].to_numpy(dtype=float))
+        assert obtenido['Nro de Cupla'].tolist() == esperado['Nro de Cupla'].tolist()
+
+
+def agrupar_por_fila(picos):
+    """Filtro de picos de la versión por fila: se descarta si algún aceptado está en [pico - 1, pico + 1]."""
+    aceptados = []
+    for pico in picos:
+        if not any(pico - 1 <= aceptado <= pico + 1 for aceptado in aceptados):
+            aceptados.append(pico)
+    return np.sort(aceptados)
+
+
+@pytest.mark.parametrize('signo', [1.0, -1.0])
+def test_separacion_exacta(signo):
+    # Con este muestreo 1024.4 - 1 > 1023.4 pero 1024.4 <= 1023.4 + 1: tiene que decidir la
+    # misma cuenta que la versión por fila
+    grilla = signo * (1000 + np.arange(300) * 0.1)
+    picos = grilla[[234, 244, 254, 265, 275]]
+    np.testing.assert_array_equal(np.sort(agrupar_picos(picos)), agrupar_por_fila(picos))
+    # Picos desordenados (profundidad empalmada)
+    desordenados = grilla[[244, 234, 254, 239, 265, 249]]
+    np.testing.assert_array_equal(np.sort(agrupar_picos(desordenados)), agrupar_por_fila(desordenados))
@@ -0,0 +1,44 @@
+# Los resultados derivados solo cuentan para el presupuesto la memoria que no comparten con el pozo almacenado
+
+import numpy as np
+import pandas as pd
+
+from well_store import WellStore
+from welllog import WellLog
+
+
+def pozo(n=10_000, decreciente=False):
+    depth = 1000 + np.arange(n) * 0.1
+    if decreciente:
+        depth = depth[::-1].copy()
+    return pd.DataFrame({'DEPTH': depth, 'CBL': np.linspace(0, 80, n), 'CCL': np.zeros(n)})
+
+
+def cargado(store, well_data):
+    return store.obtener_o_cargar('pozo', lambda: (None, well_data))[1]
+
+
+def test_welllog_no_cuenta_las_vistas_del_pozo():
+    store = WellStore(1 << 30)
+    well_data = cargado(store, pozo())
+    antes = store.bytes_usados
+    store.derivado('pozo', 'welllog', (), lambda: WellLog.desde_dataframe(well_data))
+    assert store.bytes_usados - antes == 0
+
+
+def test_welllog_cuenta_solo_sus_arrays():
+    store = WellStore(1 << 30)
+    well_data = cargado(store, pozo(decreciente=True))
+    antes = store.bytes_usados
+    log = store.derivado('pozo', 'welllog', (), lambda: WellLog.desde_dataframe(well_data))
+    # Solo la profundidad negada, que es propia del WellLog
+    assert store.bytes_usados - antes == log._ordenada.nbytes
+
+
+def test_copias_y_memoria_repetida():
+    store = WellStore(1 << 30)
+    well_data = cargado(store, pozo())
+    antes = store.bytes_usados
+    copia = well_data['CBL'].to_numpy().copy()
+    store.derivado('pozo', 'copia', (), lambda: {'a': copia, 'b': copia[:100], 'c': well_data['CCL'].to_numpy()})
+    assert store.bytes_usados - antes == copia.nbytes
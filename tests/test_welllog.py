@@ -0,0 +1,54 @@
+# WellLog.ventana tiene que elegir las mismas filas que el filtro por máscara booleana al que reemplazó
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from welllog import WellLog
+
+
+def pozo(forma, n=500):
+    depth = 1000 + np.arange(n) * 0.1
+    if forma == 'decreciente':
+        depth = depth[::-1].copy()
+    elif forma == 'nan_al_final':
+        depth[-1] = np.nan
+    elif forma == 'nan_en_el_medio':
+        depth[[10, 250, 251]] = np.nan
+    elif forma == 'empalmado':
+        # Un tramo repetido: después de 1024.9 m se vuelve a 1010 m
+        depth = np.concatenate([depth[:250], depth[100:350]])
+    elif forma == 'irregular':
+        depth = np.sort(np.random.default_rng(0).uniform(1000, 1050, n))
+    return pd.DataFrame({'DEPTH': depth, 'CBL': np.arange(n, dtype=float)})
+
+
+def filtro_booleano(well_data, tope, base):
+    mascara = np.ones(len(well_data), dtype=bool)
+    if tope is not None:
+        mascara &= well_data['DEPTH'] >= tope
+    if base is not None:
+        mascara &= well_data['DEPTH'] <= base
+    return well_data[mascara]
+
+
+@pytest.mark.parametrize('forma', ['creciente', 'decreciente', 'nan_al_final', 'nan_en_el_medio', 'empalmado', 'irregular'])
+def test_ventana_como_mascara(forma):
+    well_data = pozo(forma)
+    log = WellLog.desde_dataframe(well_data)
+    rng = np.random.default_rng(1)
+    ventanas = [(None, None), (1150, None), (None, 1010), (1050, 1095), (1010.05, 1020.05), (2000, None), (None, 900)]
+    ventanas += [tuple(np.sort(rng.uniform(995, 1055, 2))) for _ in range(50)]
+    for tope, base in ventanas:
+        pd.testing.assert_frame_equal(well_data.iloc[log.ventana(tope, base)], filtro_booleano(well_data, tope, base))
+
+
+@pytest.mark.parametrize('forma', ['nan_al_final', 'empalmado'])
+def test_recortar_y_buscar_sin_nan(forma):
+    well_data = pozo(forma)
+    log = WellLog.desde_dataframe(well_data)
+    esperado = filtro_booleano(well_data, 1010, 1030)
+    recorte = log.recortar(1010, 1030)
+    np.testing.assert_array_equal(recorte.depth, np.sort(esperado['DEPTH'].to_numpy()))
+    np.testing.assert_array_equal(np.sort(recorte['CBL']), np.sort(esperado['CBL'].to_numpy()))
+    assert log.depth[log.indice(1020.04)] == pytest.approx(1020.0)
@@ -0,0 +1,225 @@
+# Almacén de pozos compartido por todas las sesiones del servidor de Streamlit.
+#
+# Cada pozo parseado se guarda una sola vez por contenido (ver app.clave_contenido)
+# y las páginas reciben vistas de solo lectura, de modo que la memoria del servidor
+# crece con la cantidad de pozos distintos y no con la cantidad de usuarios.
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Presupuesto de memoria por defecto (MB); se puede cambiar con LAS_WELL_STORE_MB
+PRESUPUESTO_MB = 1024
+
+# Atributo de los DataFrames almacenados con la clave del pozo, para cachear resultados derivados
+ATTR_CLAVE = 'clave_pozo'
+
+# Resultados derivados que se conservan por pozo y etapa. Cada etapa tiene su propio LRU,
+# así una etapa que cambia de parámetros a cada rerun (p. ej. la correlación de las_q con
+# el slider de profundidad) no desaloja la clasificación ni el WellLog del mismo pozo.
+MAX_DERIVADOS_POR_ETAPA = 8
+
+# Con Copy-on-Write una copia superficial comparte los arrays del pozo almacenado y
+# cualquier escritura de una página copia solo la columna modificada. A partir de
+# pandas 3.0 ya está siempre activo.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+def tamano_pozo(las_file, well_data):
+    """Estima los bytes ocupados por un pozo (DataFrame más los arrays de curvas del LASFile)."""
+    total = int(well_data.memory_usage(index=True, deep=True).sum())
+    if las_file is not None:
+        for curve in las_file.curves:
+            data = getattr(curve, 'data', None)
+            total += getattr(data, 'nbytes', 0)
+    return total
+
+
+def arrays_pozo(las_file, well_data):
+    """Arrays que ya cuenta tamano_pozo: columnas e índice del DataFrame y datos de las curvas."""
+    arrays = [columna.to_numpy() for _, columna in well_data.items()] + [well_data.index.to_numpy()]
+    if las_file is not None:
+        arrays += [c.data for c in las_file.curves if isinstance(getattr(c, 'data', None), np.ndarray)]
+    return arrays
+
+
+def _arrays(valor, vistos, nivel=0):
+    """Recorre un resultado derivado y devuelve los ndarrays que contiene."""
+    if id(valor) in vistos or nivel > 4:
+        return
+    vistos.add(id(valor))
+    if isinstance(valor, np.ndarray):
+        yield valor
+    elif isinstance(valor, pd.DataFrame):
+        for _, columna in valor.items():
+            yield columna.to_numpy()
+        yield valor.index.to_numpy()
+    elif isinstance(valor, (pd.Series, pd.Index)):
+        yield valor.to_numpy()
+    elif isinstance(valor, dict):
+        for v in valor.values():
+            yield from _arrays(v, vistos, nivel + 1)
+    elif isinstance(valor, (list, tuple)):
+        for v in valor:
+            yield from _arrays(v, vistos, nivel + 1)
+    elif hasattr(valor, '__dict__'):
+        for v in vars(valor).values():
+            yield from _arrays(v, vistos, nivel + 1)
+
+
+def tamano_derivado(valor, compartidos=()):
+    """Estima los bytes propios de un resultado derivado (arrays, bytes u objetos con arrays).
+
+    No cuenta los arrays que comparten memoria con compartidos (las vistas del pozo
+    almacenado, que ya cuenta tamano_pozo) ni dos veces la misma memoria.
+    """
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    contados = list(compartidos)
+    total = 0
+    for array in sorted(_arrays(valor, set()), key=lambda a: a.nbytes, reverse=True):
+        if any(np.may_share_memory(array, otro) for otro in contados):
+            continue
+        contados.append(array)
+        total += int(array.nbytes)
+    return total
+
+
+def clave_pozo(well_data):
+    """Clave del pozo almacenado del que proviene well_data, o None si no salió del almacén."""
+    return well_data.attrs.get(ATTR_CLAVE)
+
+
+def vista(well_data):
+    """Devuelve una vista de solo lectura del DataFrame almacenado."""
+    return well_data.copy(deep=False)
+
+
+class WellStore:
+    """Caché LRU de pozos parseados, con desalojo por presupuesto de bytes."""
+
+    def __init__(self, presupuesto_bytes):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._pozos = OrderedDict()
+        self._en_carga = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pozos)
+
+    @property
+    def bytes_usados(self):
+        return self._bytes
+
+    def obtener(self, clave):
+        """Devuelve (las_file, vista de well_data) o None si el pozo no está almacenado."""
+        with self._lock:
+            entrada = self._pozos.get(clave)
+            if entrada is None:
+                return None
+            self._pozos.move_to_end(clave)
+            return entrada['las_file'], vista(entrada['well_data'])
+
+    def guardar(self, clave, las_file, well_data):
+        """Almacena un pozo y desaloja los menos usados hasta respetar el presupuesto."""
+        nbytes = tamano_pozo(las_file, well_data)
+        well_data.attrs[ATTR_CLAVE] = clave
+        with self._lock:
+            anterior = self._pozos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior['nbytes']
+            self._pozos[clave] = {'las_file': las_file, 'well_data': well_data, 'nbytes': nbytes,
+                                  'derivados': {}}
+            self._bytes += nbytes
+            self._desalojar()
+        return las_file, vista(well_data)
+
+    def obtener_o_cargar(self, clave, cargar):
+        """Devuelve el pozo almacenado o lo carga con cargar() una sola vez aunque lo pidan varias sesiones a la vez."""
+        while True:
+            resultado = self.obtener(clave)
+            if resultado is not None:
+                return resultado
+            with self._lock:
+                evento = self._en_carga.get(clave)
+                if evento is None:
+                    evento = threading.Event()
+                    self._en_carga[clave] = evento
+                    propio = True
+                else:
+                    propio = False
+            if not propio:
+                # Otra sesión está parseando el mismo archivo: esperar su resultado
+                evento.wait()
+                continue
+            try:
+                las_file, well_data = cargar()
+                return self.guardar(clave, las_file, well_data)
+            finally:
+                with self._lock:
+                    del self._en_carga[clave]
+                evento.set()
+
+    def derivado(self, clave, etapa, parametros, calcular):
+        """Resultado de calcular() para una etapa del pozo, cacheado por (etapa, parámetros).
+
+        Los resultados viven mientras el pozo siga almacenado y cuentan para el presupuesto.
+        parametros debe ser una tupla con todo lo que afecta a la etapa. Sin clave (pozo que
+        no salió del almacén) se calcula siempre. Los arrays devueltos son de solo lectura
+        porque se comparten entre sesiones.
+        """
+        if clave is None:
+            return calcular()
+        with self._lock:
+            entrada = self._pozos.get(clave)
+            derivados = entrada['derivados'].get(etapa) if entrada is not None else None
+            if derivados is not None and parametros in derivados:
+                derivados.move_to_end(parametros)
+                return derivados[parametros][0]
+            compartidos = arrays_pozo(entrada['las_file'], entrada['well_data']) if entrada is not None else ()
+
+        valor = calcular()
+        if isinstance(valor, np.ndarray):
+            valor.flags.writeable = False
+        nbytes = tamano_derivado(valor, compartidos)
+        with self._lock:
+            entrada = self._pozos.get(clave)
+            if entrada is None:
+                return valor
+            derivados = entrada['derivados'].setdefault(etapa, OrderedDict())
+            if parametros in derivados:
+                return valor
+            derivados[parametros] = (valor, nbytes)
+            entrada['nbytes'] += nbytes
+            self._bytes += nbytes
+            while len(derivados) > MAX_DERIVADOS_POR_ETAPA:
+                _, (_, liberados) = derivados.popitem(last=False)
+                entrada['nbytes'] -= liberados
+                self._bytes -= liberados
+            self._desalojar()
+        return valor
+
+    def descartar(self, clave):
+        with self._lock:
+            entrada = self._pozos.pop(clave, None)
+            if entrada is not None:
+                self._bytes -= entrada['nbytes']
+
+    def limpiar(self):
+        with self._lock:
+            self._pozos.clear()
+            self._bytes = 0
+
+    def _desalojar(self):
+        # Siempre se conserva el último pozo agregado, aunque exceda el presupuesto por sí solo
+        while self._bytes > self.presupuesto_bytes and len(self._pozos) > 1:
+            _, entrada = self._pozos.popitem(last=False)
+            self._bytes -= entrada['nbytes']
+
+
+store = WellStore(int(float(os.environ.get('LAS_WELL_STORE_MB', PRESUPUESTO_MB)) * 1024 * 1024))
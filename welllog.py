@@ -0,0 +1,153 @@
+# Contenedor compacto de un pozo: curvas como arrays contiguos de NumPy y búsqueda de
+# profundidad en O(1) cuando el muestreo es regular (búsqueda binaria si no lo es).
+#
+# Reemplaza filtros del tipo well_data[(well_data['DEPTH'] >= a) & (well_data['DEPTH'] <= b)],
+# que recorren el pozo completo en cada consulta, por un slice de índices.
+
+import numpy as np
+
+import well_store
+
+# Desvío máximo de una muestra respecto de la grilla regular, en fracciones del paso, para
+# considerar el muestreo uniforme; con menos de medio paso la posición estimada por
+# aritmética está a lo sumo a una muestra de la real.
+TOLERANCIA_PASO = 0.25
+
+
+class WellLog:
+    """Profundidad y curvas de un pozo con consultas por profundidad en O(1) u O(log N).
+
+    La profundidad suele ser monótona (creciente o decreciente, como en los .LAS). Si no lo
+    es (tramos empalmados o repetidos) o tiene NaN, se ordena al construir con los NaN al
+    final: depth y las curvas quedan en ese orden y dejan de ser vistas del DataFrame
+    original, pero ventana() sigue devolviendo posiciones de las filas originales.
+    """
+
+    def __init__(self, depth, curvas):
+        depth = np.ascontiguousarray(depth, dtype=float)
+        curvas = {nombre: np.ascontiguousarray(valores) for nombre, valores in curvas.items()}
+        diferencias = np.diff(depth)
+        # Posición original de cada muestra ordenada (None si no hubo que ordenar); una
+        # profundidad NaN hace falsas las dos comparaciones y también se ordena
+        self._orden = None
+        if not (np.all(diferencias >= 0) or np.all(diferencias <= 0)):
+            self._orden = np.argsort(depth, kind='stable')
+            depth = depth[self._orden]
+            curvas = {nombre: valores[self._orden] for nombre, valores in curvas.items()}
+        self.depth = depth
+        self.curvas = curvas
+        # Muestras con profundidad (los NaN quedaron al final); las búsquedas se hacen solo sobre ellas
+        validas = len(depth) - int(np.count_nonzero(np.isnan(depth)))
+        self.creciente = validas < 2 or depth[validas - 1] >= depth[0]
+        # Las búsquedas se hacen sobre la profundidad con signo, que siempre crece; se arma
+        # una vez (o es la misma profundidad) para que cada consulta no recorra el pozo
+        self._signo = 1.0 if self.creciente else -1.0
+        self._ordenada = (depth if self.creciente else -depth)[:validas]
+        self.paso = self._detectar_paso()
+
+    @classmethod
+    def desde_dataframe(cls, well_data, columnas=None):
+        """WellLog con la profundidad y las columnas numéricas (o las pedidas) de well_data, sin copiarlas."""
+        if columnas is None:
+            columnas = [col for col in well_data.select_dtypes('number').columns if col != 'DEPTH']
+        return cls(well_data['DEPTH'].to_numpy(dtype=float), {col: well_data[col].to_numpy() for col in columnas})
+
+    def _detectar_paso(self):
+        depth = self.depth[:len(self._ordenada)]
+        n = len(depth)
+        if n < 2 or depth[-1] == depth[0]:
+            return None
+        paso = (depth[-1] - depth[0]) / (n - 1)
+        desvio = np.max(np.abs(depth - (depth[0] + paso * np.arange(n))))
+        return paso if desvio <= TOLERANCIA_PASO * abs(paso) else None
+
+    def __len__(self):
+        return len(self.depth)
+
+    def __getitem__(self, nombre):
+        if nombre == 'DEPTH':
+            return self.depth
+        return self.curvas[nombre]
+
+    @property
+    def nbytes(self):
+        extra = 0 if np.may_share_memory(self._ordenada, self.depth) else self._ordenada.nbytes
+        if self._orden is not None:
+            extra += self._orden.nbytes
+        return self.depth.nbytes + extra + sum(valores.nbytes for valores in self.curvas.values())
+
+    def buscar(self, profundidades, lado='left'):
+        """Como np.searchsorted sobre la profundidad en el sentido del registro.
+
+        En un registro decreciente devuelve la posición respecto de -depth, de modo que
+        las muestras más profundas que x quedan a partir del índice devuelto con lado='right'.
+        """
+        x = self._signo * np.asarray(profundidades, dtype=float)
+        ordenada = self._ordenada
+        if self.paso is None:
+            return np.searchsorted(ordenada, x, side=lado)
+
+        # Posición estimada por aritmética y corregida mirando las muestras vecinas
+        n = len(ordenada)
+        with np.errstate(invalid='ignore'):
+            estimada = np.floor((x - ordenada[0]) / abs(self.paso))
+        base = np.clip(np.nan_to_num(estimada, nan=n), -1, n).astype(np.intp) - 1
+        base = np.clip(base, 0, n)
+        resultado = base.copy()
+        for k in range(3):
+            vecina = ordenada[np.minimum(base + k, n - 1)]
+            cumple = vecina < x if lado == 'left' else vecina <= x
+            resultado += (base + k < n) & cumple
+        return resultado
+
+    def indice(self, profundidad):
+        """Índice (en depth y en las curvas) de la muestra más cercana a la profundidad."""
+        derecha = int(np.clip(self.buscar(profundidad), 0, len(self._ordenada) - 1))
+        izquierda = max(derecha - 1, 0)
+        if abs(self.depth[izquierda] - profundidad) <= abs(self.depth[derecha] - profundidad):
+            return izquierda
+        return derecha
+
+    def _ventana_ordenada(self, tope, base):
+        """Slice de depth y las curvas con tope <= profundidad <= base.
+
+        Las muestras sin profundidad (NaN) solo entran sin ningún límite, como en una máscara booleana.
+        """
+        if tope is None and base is None:
+            return slice(0, len(self.depth))
+        minimo = -np.inf if tope is None else tope
+        maximo = np.inf if base is None else base
+        if self.creciente:
+            return slice(int(self.buscar(minimo, 'left')), int(self.buscar(maximo, 'right')))
+        return slice(int(self.buscar(maximo, 'left')), int(self.buscar(minimo, 'right')))
+
+    def ventana(self, tope=None, base=None):
+        """Filas del DataFrame original con tope <= profundidad <= base (None deja el extremo abierto), para iloc.
+
+        Es un slice si no hubo que ordenar la profundidad; si no, las posiciones originales de
+        esas filas en orden creciente, las mismas que elige la máscara booleana equivalente.
+        Sin tope ni base entran todas las filas, también las de profundidad NaN.
+        """
+        ventana = self._ventana_ordenada(tope, base)
+        if self._orden is None:
+            return ventana
+        return np.sort(self._orden[ventana])
+
+    def recortar(self, tope=None, base=None):
+        """WellLog del intervalo, con vistas de los mismos arrays (sin copiar datos)."""
+        ventana = self._ventana_ordenada(tope, base)
+        recorte = WellLog.__new__(WellLog)
+        recorte.depth = self.depth[ventana]
+        recorte.curvas = {nombre: valores[ventana] for nombre, valores in self.curvas.items()}
+        recorte.creciente = self.creciente
+        recorte._orden = None
+        recorte._signo = self._signo
+        recorte._ordenada = self._ordenada[ventana]
+        recorte.paso = self.paso if len(recorte.depth) > 1 else None
+        return recorte
+
+
+def well_log(well_data):
+    """WellLog del pozo, armado una vez por pozo almacenado."""
+    return well_store.store.derivado(well_store.clave_pozo(well_data), 'welllog', (tuple(well_data.columns),),
+                                     lambda: WellLog.desde_dataframe(well_data))